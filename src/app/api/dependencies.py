@@ -1,11 +1,21 @@
 """Dependency injection for FastAPI endpoints."""
 
+from arq import ArqRedis
 from fastapi import Request
 
+from app.core.config import get_settings
 from app.services.ingestion_service import IngestionService
 from app.services.rag_service import RAGService
 from app.services.vector_service import VectorService
 
+__all__ = [
+    "get_arq_pool",
+    "get_ingestion_service",
+    "get_rag_service",
+    "get_settings",
+    "get_vector_service",
+]
+
 
 def get_vector_service(request: Request) -> VectorService:
     """Get vector service from application state."""
@@ -13,12 +23,15 @@ def get_vector_service(request: Request) -> VectorService:
 
 
 def get_rag_service(request: Request) -> RAGService:
-    """Get RAG service with vector service dependency."""
-    vector_service = get_vector_service(request)
-    return RAGService(vector_service)
+    """Get RAG service from application state."""
+    return request.app.state.rag_service
 
 
 def get_ingestion_service(request: Request) -> IngestionService:
-    """Get ingestion service with vector service dependency."""
-    vector_service = get_vector_service(request)
-    return IngestionService(vector_service)
+    """Get ingestion service from application state."""
+    return request.app.state.ingestion_service
+
+
+def get_arq_pool(request: Request) -> ArqRedis | None:
+    """Get the ingestion job queue, or None when ingestion runs in-process."""
+    return getattr(request.app.state, "arq_pool", None)
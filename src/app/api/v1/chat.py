@@ -1,22 +1,29 @@
 """Chat API endpoints with streaming support."""
 
+import asyncio
 import json
 
+import orjson
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
-from app.api.dependencies import get_rag_service
+from app.api.dependencies import get_rag_service, get_settings
+from app.core.config import Settings
 from app.schemas.chat import ChatRequest
 from app.services.rag_service import RAGService
 
 router = APIRouter()
 
+# Marks the end of the generated stream in the producer queue
+_STREAM_END = object()
+
 
 @router.post("/stream")
 async def stream_chat(
     request: ChatRequest,
     rag_service: RAGService = Depends(get_rag_service),
+    settings: Settings = Depends(get_settings),
 ) -> EventSourceResponse:
     """
     Stream chat responses using Server-Sent Events (SSE).
@@ -26,19 +33,34 @@ async def stream_chat(
     """
     messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
 
+    # Bounded buffer between the LLM stream and the client, so a slow client
+    # pauses generation instead of letting events pile up in memory
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.sse_queue_size)
+
+    async def produce():
+        try:
+            async for item in rag_service.generate_stream(messages, request.query):
+                await queue.put(item)
+            await queue.put(_STREAM_END)
+        except Exception as e:
+            await queue.put(e)
+
     async def event_generator():
+        producer = asyncio.create_task(produce())
         try:
             sources = []
             chunk_count = 0
-            async for text_chunk, chunk_sources in rag_service.generate_stream(
-                messages, request.query
-            ):
+            while (item := await queue.get()) is not _STREAM_END:
+                if isinstance(item, Exception):
+                    raise item
+
+                text_chunk, chunk_sources = item
                 if text_chunk:
                     # Send text chunk
                     chunk_count += 1
                     yield {
                         "event": "message",
-                        "data": json.dumps({"type": "chunk", "content": text_chunk}),
+                        "data": orjson.dumps({"type": "chunk", "content": text_chunk}).decode(),
                         "id": str(chunk_count),
                     }
                 if chunk_sources:
@@ -48,16 +70,16 @@ async def stream_chat(
             if sources:
                 yield {
                     "event": "sources",
-                    "data": json.dumps({"type": "sources", "sources": sources}),
+                    "data": orjson.dumps({"type": "sources", "sources": sources}).decode(),
                     "id": "sources",
                 }
             yield {
                 "event": "done",
-                "data": json.dumps({"type": "done"}),
+                "data": orjson.dumps({"type": "done"}).decode(),
                 "id": "done",
             }
         except Exception as e:
-            # Send error event
+            # Send error event (stdlib json, so an orjson failure above is still reported)
             import traceback
             error_details = traceback.format_exc()
             yield {
@@ -70,8 +92,15 @@ async def stream_chat(
                 "data": json.dumps({"type": "done"}),
                 "id": "done",
             }
+        finally:
+            # Stop generation if the client went away mid-stream
+            producer.cancel()
 
-    return EventSourceResponse(event_generator())
+    return EventSourceResponse(
+        event_generator(),
+        ping=settings.sse_ping_interval,
+        send_timeout=settings.sse_send_timeout,
+    )
 
 
 @router.post("/chat")
@@ -1,26 +1,71 @@
 """Document ingestion API endpoints."""
 
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from arq import ArqRedis
+from arq.jobs import Job, JobStatus
 from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
-from app.api.dependencies import get_ingestion_service
-from app.schemas.document import UploadResponse
+from app.api.dependencies import get_arq_pool, get_ingestion_service, get_vector_service
+from app.core.config import settings
+from app.schemas.document import ProcessingStatus, UploadResponse
 from app.services.ingestion_service import IngestionService
+from app.services.vector_service import VectorService
 
 router = APIRouter()
 
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_READ_SIZE = 1024 * 1024  # Read uploads 1MB at a time
+SPOOL_MAX_SIZE = 8 * 1024 * 1024  # Keep up to 8MB in memory before spilling to disk
+PDF_MAGIC = b"%PDF-"  # Every PDF file starts with this header
+
+
+async def _process_and_close(
+    ingestion_service: IngestionService,
+    file_obj: BinaryIO,
+    filename: str,
+    content_hash: str,
+) -> None:
+    """Process a spooled upload and release its buffer afterwards."""
+    try:
+        await ingestion_service.process_document(file_obj, filename, content_hash)
+    finally:
+        file_obj.close()
+
+
+def _persist_upload(file_obj: BinaryIO) -> Path:
+    """Write a spooled upload to the shared upload directory."""
+    upload_dir = Path(settings.upload_dir)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / f"{uuid.uuid4().hex}.pdf"
+    with path.open("wb") as dest:
+        shutil.copyfileobj(file_obj, dest)
+    return path
+
 
 @router.post("/upload", status_code=202, response_model=UploadResponse)
 async def upload_document(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     ingestion_service: IngestionService = Depends(get_ingestion_service),
+    vector_service: VectorService = Depends(get_vector_service),
+    arq_pool: ArqRedis | None = Depends(get_arq_pool),
 ) -> UploadResponse:
     """
     Upload and process a PDF document.
 
     Returns immediately with 202 Accepted status.
-    Processing happens in the background.
+    Processing happens on an arq worker when a queue is configured,
+    otherwise in a background task of this process.
+    Re-uploading a document that is already ingested or being ingested
+    returns 200 with its existing status instead of processing it again.
     """
     # Validate file type
     if not file.filename or not file.filename.lower().endswith(".pdf"):
@@ -29,22 +74,124 @@ async def upload_document(
             detail="Only PDF files are supported",
         )
 
-    # Validate file size (e.g., 50MB limit)
-    file_content = await file.read()
-    if len(file_content) > 50 * 1024 * 1024:  # 50MB
+    # Reject oversized uploads up front when the size is already known
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
         raise HTTPException(
-            status_code=400,
+            status_code=413,
             detail="File size exceeds 50MB limit",
         )
 
+    # Reject renamed non-PDF files before buffering anything
+    header = await file.read(len(PDF_MAGIC))
+    if header != PDF_MAGIC:
+        raise HTTPException(
+            status_code=400,
+            detail="File is not a valid PDF",
+        )
+
+    # Stream the upload into a spooled buffer instead of reading it into memory
+    # at once, aborting as soon as the size limit is exceeded
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+    hasher = hashlib.blake2b(header, digest_size=16)
+    spool.write(header)
+    size = len(header)
+    while chunk := await file.read(UPLOAD_READ_SIZE):
+        size += len(chunk)
+        if size > MAX_UPLOAD_SIZE:
+            spool.close()
+            raise HTTPException(
+                status_code=413,
+                detail="File size exceeds 50MB limit",
+            )
+        hasher.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+
+    # Claim the document so duplicate uploads and retries don't re-embed it
+    content_hash = hasher.hexdigest()
+    job_id = uuid.uuid4().hex
+    if not await vector_service.try_claim_document(content_hash, file.filename, job_id):
+        spool.close()
+        document = await vector_service.get_document(content_hash)
+        status = document["status"] if document else "running"
+        return ORJSONResponse(
+            status_code=200,
+            content=UploadResponse(
+                message=f"Document was already uploaded (status: {status}).",
+                filename=file.filename,
+                job_id=document["job_id"] if document and arq_pool is not None else None,
+            ).model_dump(mode="json"),
+        )
+
+    # Queue the job for a worker, which reads the upload back from disk
+    if arq_pool is not None:
+        path = None
+        try:
+            try:
+                path = await asyncio.to_thread(_persist_upload, spool)
+            finally:
+                spool.close()
+            job = await arq_pool.enqueue_job(
+                "ingest_job", str(path), file.filename, content_hash, _job_id=job_id
+            )
+        except BaseException:
+            # Release the claim, or re-uploads are refused until it goes stale
+            await vector_service.set_document_status(content_hash, "failed")
+            if path is not None:
+                path.unlink(missing_ok=True)
+            raise
+        return UploadResponse(
+            message="Upload accepted. Document is being processed.",
+            filename=file.filename,
+            job_id=job.job_id,
+        )
+
     # Add background task for processing
     background_tasks.add_task(
-        ingestion_service.process_document,
-        file_content,
+        _process_and_close,
+        ingestion_service,
+        spool,
         file.filename,
+        content_hash,
     )
 
     return UploadResponse(
         message="Upload accepted. Document is being processed.",
         filename=file.filename,
     )
+
+
+@router.get("/status/{job_id}", response_model=ProcessingStatus)
+async def get_processing_status(
+    job_id: str,
+    arq_pool: ArqRedis | None = Depends(get_arq_pool),
+) -> ProcessingStatus:
+    """Get the processing status of a queued ingestion job."""
+    if arq_pool is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job tracking requires the ingestion queue to be configured",
+        )
+
+    job = Job(job_id, arq_pool)
+    info = await job.info()
+    if info is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    filename = info.args[1]
+    if await job.status() != JobStatus.complete:
+        return ProcessingStatus(filename=filename, status="processing")
+
+    result = await job.result_info()
+    if not result.success:
+        return ProcessingStatus(filename=filename, status="failed", error=str(result.result))
+    # ingest_job reports a missing upload as a failed result rather than raising
+    if result.result.get("status") == "failed":
+        return ProcessingStatus(filename=filename, status="failed", error=result.result["error"])
+
+    return ProcessingStatus(
+        filename=filename,
+        status="completed",
+        parent_chunks=result.result["parent_chunks"],
+        child_chunks=result.result["child_chunks"],
+    )
@@ -1,5 +1,8 @@
 """Configuration module using Pydantic Settings for environment variables."""
 
+from functools import lru_cache
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -33,10 +36,30 @@ class Settings(BaseSettings):
 
     # Neon DB Configuration
     neon_db_url: str = Field(..., description="Neon DB connection string")
+    neon_pooled_url: str | None = Field(
+        default=None,
+        description="Neon pooled (-pooler host) connection string used for queries; "
+        "neon_db_url is then only used for schema setup",
+    )
+    neon_db_pool_min_size: int = Field(
+        default=4,
+        ge=0,
+        description="Database connections opened when the pool starts",
+    )
     neon_db_pool_size: int = Field(
         default=10,
         ge=1,
-        description="Database connection pool size",
+        description="Maximum database connection pool size",
+    )
+    neon_db_pool_idle_timeout: float = Field(
+        default=300.0,
+        ge=0,
+        description="Seconds an idle pooled connection stays open (0 keeps connections forever)",
+    )
+    neon_db_command_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        description="Seconds a database query may run before it is cancelled",
     )
 
     # Embedding Configuration
@@ -49,6 +72,33 @@ class Settings(BaseSettings):
         ge=128,
         description="Embedding vector dimension",
     )
+    embedding_precision: Literal["fp32", "fp16"] = Field(
+        default="fp16",
+        description="Storage precision of embeddings (fp16 stores them as pgvector halfvec)",
+    )
+    embedding_device: str | None = Field(
+        default=None,
+        description="Device the embedding model runs on, e.g. cpu or cuda "
+        "(defaults to CUDA when available, else CPU)",
+    )
+    embedding_workers: int = Field(
+        default=0,
+        ge=0,
+        description="Worker processes used to embed documents (0 embeds in-process)",
+    )
+    embedding_threads: int | None = Field(
+        default=None,
+        ge=1,
+        description="Torch threads used by the embedding model (defaults to torch's choice)",
+    )
+    embedding_backend: Literal["torch", "onnx"] = Field(
+        default="torch",
+        description="Inference backend of the embedding model",
+    )
+    embedding_onnx_file: str | None = Field(
+        default=None,
+        description="ONNX file in the model repo to load, e.g. onnx/model_qint8_avx512.onnx",
+    )
 
     # Chunking Configuration
     parent_chunk_size: int = Field(
@@ -73,6 +123,36 @@ class Settings(BaseSettings):
         description="Overlap between child chunks in characters",
     )
 
+    # Ingestion Configuration
+    ingest_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of parent chunks stored concurrently during ingestion",
+    )
+    ingest_batch_size: int = Field(
+        default=64,
+        ge=1,
+        description="Number of child chunks embedded and inserted together during ingestion",
+    )
+    ingest_pipeline_depth: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of child chunk batches being embedded or inserted at once",
+    )
+    redis_url: str | None = Field(
+        default=None,
+        description="Redis URL for the ingestion job queue (ingestion runs in-process if unset)",
+    )
+    upload_dir: str = Field(
+        default="data/uploads",
+        description="Directory where uploads are stored until a worker ingests them",
+    )
+    ingest_job_timeout: int = Field(
+        default=600,
+        ge=1,
+        description="Maximum time in seconds a queued ingestion job may run",
+    )
+
     # Retrieval Configuration
     top_k_retrieval: int = Field(
         default=5,
@@ -80,6 +160,55 @@ class Settings(BaseSettings):
         le=20,
         description="Number of top chunks to retrieve",
     )
+    hnsw_ef_search: int = Field(
+        default=40,
+        ge=1,
+        le=1000,
+        description="Minimum HNSW candidate list size used per vector search",
+    )
+    index_maintenance_work_mem: str = Field(
+        default="512MB",
+        pattern=r"^\d+(kB|MB|GB)$",
+        description="maintenance_work_mem used while building the HNSW index",
+    )
+    context_message_cache_size: int = Field(
+        default=4096,
+        ge=1,
+        description="Maximum number of retrieved chunks whose prompt context messages are cached",
+    )
+    semantic_cache_ttl: int = Field(
+        default=300,
+        ge=1,
+        description="Seconds retrieved chunks stay cached for a query",
+    )
+    semantic_cache_size: int = Field(
+        default=1024,
+        ge=1,
+        description="Maximum number of query embeddings kept for semantic cache lookups",
+    )
+    semantic_cache_threshold: float = Field(
+        default=0.95,
+        ge=0.0,
+        le=1.0,
+        description="Cosine similarity above which a cached query's chunks are reused",
+    )
+
+    # Streaming Configuration
+    sse_ping_interval: int = Field(
+        default=15,
+        ge=1,
+        description="Seconds between SSE keep-alive pings",
+    )
+    sse_send_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        description="Seconds to wait for a client to accept an SSE event before disconnecting",
+    )
+    sse_queue_size: int = Field(
+        default=64,
+        ge=1,
+        description="Maximum number of generated events buffered per streaming connection",
+    )
 
     # Streamlit Configuration
     streamlit_port: int = Field(
@@ -100,6 +229,10 @@ class Settings(BaseSettings):
         le=65535,
         description="Port for FastAPI server",
     )
+    startup_warmup: bool = Field(
+        default=True,
+        description="Prime the embedding model and Groq connection on startup",
+    )
 
     # CORS Configuration
     cors_origins: list[str] = Field(
@@ -108,5 +241,11 @@ class Settings(BaseSettings):
     )
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the application settings, parsing the environment only once."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -1,9 +1,14 @@
 """Startup and shutdown event handlers for FastAPI application."""
 
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
+from arq import create_pool
+from arq.connections import RedisSettings
 from fastapi import FastAPI
 
+from app.core.config import settings
+from app.services.ingestion_service import IngestionService
+from app.services.rag_service import RAGService
 from app.services.vector_service import VectorService
 
 
@@ -15,7 +20,24 @@ async def lifespan(app: FastAPI):
     await vector_service.initialize()
     app.state.vector_service = vector_service
 
+    # Services only depend on the vector service, so build them once and share
+    app.state.rag_service = RAGService(vector_service)
+    app.state.ingestion_service = IngestionService(vector_service)
+
+    # Hand ingestion to arq workers when a queue is configured
+    app.state.arq_pool = None
+    if settings.redis_url:
+        app.state.arq_pool = await create_pool(RedisSettings.from_dsn(settings.redis_url))
+
+    # Prime the Groq HTTP connection so the first chat request doesn't pay for
+    # TLS handshakes (the embedding model is warmed up by initialize); failures are ignored
+    if settings.startup_warmup:
+        with suppress(Exception):
+            await app.state.rag_service.llm.ainvoke("ping")
+
     yield
 
     # Shutdown
+    if app.state.arq_pool is not None:
+        await app.state.arq_pool.close()
     await vector_service.close()
@@ -2,6 +2,7 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import settings
 from app.core.events import lifespan
@@ -15,6 +16,7 @@ def create_app() -> FastAPI:
         title=settings.api_title,
         version=settings.api_version,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # Configure CORS
@@ -0,0 +1,15 @@
+"""Database maintenance run by hand: python -m app.maintenance (from src/)."""
+
+import asyncio
+
+from app.services.vector_service import VectorService
+
+
+async def main() -> None:
+    """Rebuild the HNSW index if the corpus has grown into another tuning tier."""
+    rebuilt = await VectorService().rebuild_hnsw_index()
+    print("HNSW index rebuilt" if rebuilt else "HNSW index already tuned for the corpus")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""Persistent embedding cache keyed by content hash and embedding model."""
+
+import hashlib
+
+import asyncpg
+import numpy as np
+
+
+def content_hash(text: str) -> str:
+    """Return the cache key of a text."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def get_cached_embeddings(
+    pool: asyncpg.Pool,
+    model: str,
+    hashes: list[str],
+) -> dict[str, np.ndarray]:
+    """
+    Look up cached embeddings in a single query.
+
+    Args:
+        pool: Connection pool with the pgvector codecs registered
+        model: Cache key of the model variant the embeddings were produced by
+        hashes: Content hashes to look up; duplicates are allowed
+
+    Returns:
+        float32 embeddings of the cached hashes, keyed by hash
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT hash, embedding FROM embedding_cache
+            WHERE model = $1 AND hash = ANY($2::text[])
+            """,
+            model,
+            list(set(hashes)),
+        )
+    return {row["hash"]: row["embedding"].to_numpy() for row in rows}
+
+
+async def put_cached_embeddings(
+    pool: asyncpg.Pool,
+    model: str,
+    embeddings: dict[str, np.ndarray],
+) -> None:
+    """
+    Store new embeddings, leaving entries another writer cached first untouched.
+
+    Args:
+        pool: Connection pool with the pgvector codecs registered
+        model: Cache key of the model variant the embeddings were produced by
+        embeddings: Embeddings keyed by content hash
+    """
+    async with pool.acquire() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO embedding_cache (hash, model, embedding)
+            VALUES ($1, $2, $3)
+            ON CONFLICT DO NOTHING
+            """,
+            [(h, model, embedding) for h, embedding in embeddings.items()],
+        )
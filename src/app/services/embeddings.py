@@ -0,0 +1,92 @@
+"""Sentence-transformers embedding model used for documents and queries."""
+
+import asyncio
+from typing import Any
+
+import numpy as np
+
+
+class SentenceTransformerEmbeddings:
+    """Embed texts with a sentence-transformers model, returning float32 arrays."""
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str | None = None,
+        backend: str = "torch",
+        model_kwargs: dict[str, Any] | None = None,
+        batch_size: int = 64,
+    ):
+        """
+        Load the embedding model.
+
+        Args:
+            model_name: Sentence-transformers model name or path
+            device: Device the model runs on (None picks CUDA when available, else CPU)
+            backend: Inference backend ("torch" or "onnx")
+            model_kwargs: Extra keyword arguments for loading the underlying model
+            batch_size: Number of texts encoded per forward pass
+        """
+        # Deferred so importing the service layer doesn't load torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(
+            model_name,
+            device=device,
+            backend=backend,
+            model_kwargs=model_kwargs,
+        )
+        # Half-precision weights halve the memory traffic of each forward pass on GPUs;
+        # on CPUs fp16 matmuls are slower, so the model stays in fp32 there
+        half = backend == "torch" and self.model.device.type == "cuda"
+        if half:
+            self.model.half()
+        self.batch_size = batch_size
+
+        # Identifies the weights actually in use, so the embedding cache never
+        # mixes embeddings of another backend, ONNX export or precision
+        onnx_file = (model_kwargs or {}).get("file_name", "") if backend == "onnx" else ""
+        precision = "fp16" if half else "fp32"
+        self.cache_key = f"{model_name}:{backend}:{onnx_file}:{precision}"
+
+    def embed_documents(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dim) matrix of unit-normalized rows."""
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32, copy=False)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query into a unit-normalized vector."""
+        return self.model.encode(
+            text,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32, copy=False)
+
+    async def aembed_documents(self, texts: list[str]) -> np.ndarray:
+        """Embed texts in a worker thread."""
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """Embed a query in a worker thread."""
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def start_multi_process_pool(self, target_devices: list[str]) -> dict[str, Any]:
+        """Start worker processes that each hold a copy of the model."""
+        return self.model.start_multi_process_pool(target_devices=target_devices)
+
+    def encode_multi_process(self, texts: list[str], pool: dict[str, Any]) -> np.ndarray:
+        """Embed texts across the worker processes of a pool."""
+        return self.model.encode_multi_process(
+            texts,
+            pool,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+
+    def stop_multi_process_pool(self, pool: dict[str, Any]) -> None:
+        """Stop the worker processes of a pool."""
+        self.model.stop_multi_process_pool(pool)
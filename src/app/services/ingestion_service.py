@@ -1,15 +1,51 @@
 """Ingestion service for PDF parsing and recursive text splitting."""
 
-import io
+import asyncio
+import re
+import threading
 import uuid
-from typing import Any
+from functools import lru_cache
+from typing import Any, BinaryIO, Final
 
-import pdfplumber
+import pypdfium2 as pdfium
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from app.core.config import settings
 from app.services.vector_service import VectorService
 
+# Separators tried in order by the splitters, escaped once here so splitting
+# does not re-escape them on every recursion step
+_SEPARATORS = [re.escape(separator) for separator in ("\n\n", "\n", ". ", " ", "")]
+
+# Chunk sizes and overlaps in characters, read from settings once at import
+_PARENT_CHUNK_SIZE: Final[int] = settings.parent_chunk_size
+_PARENT_CHUNK_OVERLAP: Final[int] = settings.parent_chunk_overlap
+_CHILD_CHUNK_SIZE: Final[int] = settings.child_chunk_size
+_CHILD_CHUNK_OVERLAP: Final[int] = settings.child_chunk_overlap
+
+
+@lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Return the shared splitter for a chunk size and overlap, building it on first use."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=_SEPARATORS,
+        is_separator_regex=True,
+        length_function=len,
+    )
+
+
+# Parent chunk splitter (large chunks for context), shared by every service instance
+_PARENT_SPLITTER = _get_splitter(_PARENT_CHUNK_SIZE, _PARENT_CHUNK_OVERLAP)
+
+# Child chunk splitter (fine-grained for retrieval); split_text_recursive's
+# defaults resolve to this same instance
+_CHILD_SPLITTER = _get_splitter(_CHILD_CHUNK_SIZE, _CHILD_CHUNK_OVERLAP)
+
+# PDFium is not thread-safe, so extraction running in worker threads is serialized
+_PDFIUM_LOCK = threading.Lock()
+
 
 class IngestionService:
     """Service for processing and ingesting documents."""
@@ -18,69 +54,117 @@ class IngestionService:
         """Initialize the ingestion service."""
         self.vector_service = vector_service
 
-        # Parent chunk splitter (large chunks for context)
-        self.parent_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.parent_chunk_size,
-            chunk_overlap=settings.parent_chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
-
-        # Child chunk splitter (fine-grained for retrieval)
-        self.child_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.child_chunk_size,
-            chunk_overlap=settings.child_chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
+        self.parent_splitter = _PARENT_SPLITTER
+        self.child_splitter = _CHILD_SPLITTER
 
     async def process_document(
         self,
-        file_content: bytes,
+        file_content: bytes | BinaryIO,
         filename: str,
+        content_hash: str | None = None,
     ) -> dict[str, Any]:
         """
         Process a PDF document and store it in the vector database.
 
         Args:
-            file_content: Raw PDF file content
+            file_content: Raw PDF file content or a seekable file object holding it
             filename: Name of the uploaded file
+            content_hash: Hash under which the document was claimed, whose
+                ingestion status is updated once processing ends
 
         Returns:
             Dictionary with processing results
         """
-        # Parse PDF
-        text_content = self._extract_text_from_pdf(file_content)
-
-        # Split into parent chunks
-        parent_chunks = self.parent_splitter.split_text(text_content)
-
-        # Process each parent chunk
-        total_child_chunks = 0
-        for idx, parent_chunk in enumerate(parent_chunks):
-            parent_id = uuid.uuid4()
-
-            # Store parent chunk
-            await self.vector_service.store_parent_chunk(
-                parent_id=parent_id,
-                document_name=filename,
-                content=parent_chunk,
-                page_number=None,  # Could be enhanced to track page numbers
-                section_title=None,  # Could be enhanced to extract section titles
-                metadata={"chunk_index": idx, "total_chunks": len(parent_chunks)},
-            )
-
-            # Split parent into child chunks
-            child_chunks = self.child_splitter.split_text(parent_chunk)
-
-            # Store child chunks with embeddings
-            await self.vector_service.store_child_chunks(
-                parent_id=parent_id,
-                child_chunks=child_chunks,
-                metadata={"parent_index": idx},
-            )
-
-            total_child_chunks += len(child_chunks)
+        try:
+            if content_hash:
+                # A failed, cancelled or stale earlier attempt may have left partial
+                # chunks behind; drop them so the document isn't stored twice
+                await self.vector_service.delete_document_chunks(content_hash)
+            result = await self._ingest_document(file_content, filename, content_hash)
+        except BaseException:
+            # Includes cancellation by arq's job timeout or a worker shutdown
+            if content_hash:
+                await self.vector_service.set_document_status(content_hash, "failed")
+            raise
+
+        if content_hash:
+            await self.vector_service.set_document_status(content_hash, "completed")
+        return result
+
+    async def _ingest_document(
+        self,
+        file_content: bytes | BinaryIO,
+        filename: str,
+        content_hash: str | None = None,
+    ) -> dict[str, Any]:
+        """Parse, split, embed and store a PDF document."""
+        # Parse PDF and split into parent chunks off the event loop, since both
+        # are CPU-bound and would otherwise stall concurrent requests
+        text_content = await asyncio.to_thread(self._extract_text_from_pdf, file_content)
+        parent_chunks = await asyncio.to_thread(self.parent_splitter.split_text, text_content)
+
+        # Split every parent into child chunks up front
+        children_per_parent = await asyncio.to_thread(
+            lambda: [self.child_splitter.split_text(chunk) for chunk in parent_chunks]
+        )
+
+        all_children = [child for children in children_per_parent for child in children]
+
+        # Store parent chunks concurrently, bounded to avoid exhausting the
+        # connection pool
+        semaphore = asyncio.Semaphore(settings.ingest_concurrency)
+        parent_ids = [uuid.uuid4() for _ in parent_chunks]
+
+        async def _store_parent(idx: int) -> None:
+            async with semaphore:
+                await self.vector_service.store_parent_chunk(
+                    parent_id=parent_ids[idx],
+                    document_name=filename,
+                    content=parent_chunks[idx],
+                    page_number=None,  # Could be enhanced to track page numbers
+                    section_title=None,  # Could be enhanced to extract section titles
+                    metadata={"chunk_index": idx, "total_chunks": len(parent_chunks)},
+                    content_hash=content_hash,
+                )
+
+        # Embed and insert child chunks in pipelined batches, so one batch is
+        # embedded while another is being written to the database
+        child_rows = [
+            (parent_ids[idx], child_chunk, idx)
+            for idx, child_chunks in enumerate(children_per_parent)
+            for child_chunk in child_chunks
+        ]
+        pipeline = asyncio.Semaphore(settings.ingest_pipeline_depth)
+
+        async def _embed_and_store(batch: list[tuple[uuid.UUID, str, int]]) -> None:
+            async with pipeline:
+                embeddings = await self.vector_service.embed_batch(
+                    [child_chunk for _, child_chunk, _ in batch]
+                )
+                # Children reference their parents, which must be stored first
+                await asyncio.wait(parent_tasks)
+                await self.vector_service.bulk_store_child_chunks(
+                    [
+                        (parent_id, child_chunk, embedding, {"parent_index": idx})
+                        for (parent_id, child_chunk, idx), embedding in zip(batch, embeddings)
+                    ]
+                )
+
+        # One task group runs every store, so the first failure cancels the rest
+        # instead of leaving them to write rows for a document marked failed
+        batch_size = settings.ingest_batch_size
+        try:
+            async with asyncio.TaskGroup() as group:
+                parent_tasks = [
+                    group.create_task(_store_parent(idx)) for idx in range(len(parent_chunks))
+                ]
+                for i in range(0, len(child_rows), batch_size):
+                    group.create_task(_embed_and_store(child_rows[i : i + batch_size]))
+        except ExceptionGroup as errors:
+            # Surface the first failure itself, as callers expect
+            raise errors.exceptions[0]
+
+        total_child_chunks = len(all_children)
 
         return {
             "filename": filename,
@@ -89,25 +173,31 @@ class IngestionService:
             "status": "success",
         }
 
-    def _extract_text_from_pdf(self, file_content: bytes) -> str:
+    def _extract_text_from_pdf(self, file_content: bytes | BinaryIO) -> str:
         """
         Extract text from PDF file.
 
         Args:
-            file_content: Raw PDF file content
+            file_content: Raw PDF file content or a seekable file object holding it
 
         Returns:
             Extracted text content
         """
         text_parts = []
-        file_obj = io.BytesIO(file_content)
 
         try:
-            with pdfplumber.open(file_obj) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
+            with _PDFIUM_LOCK:
+                pdf = pdfium.PdfDocument(file_content)
+                try:
+                    for page in pdf:
+                        textpage = page.get_textpage()
+                        text = textpage.get_text_range()
+                        textpage.close()
+                        page.close()
+                        if text:
+                            text_parts.append(text)
+                finally:
+                    pdf.close()
         except Exception as e:
             raise ValueError(f"Failed to extract text from PDF: {str(e)}") from e
 
@@ -127,15 +217,22 @@ class IngestionService:
         Args:
             text: Text to split
             chunk_size: Size of chunks (defaults to child chunk size)
-            chunk_overlap: Overlap between chunks
+            chunk_overlap: Overlap between chunks (defaults to child chunk overlap)
 
         Returns:
             List of text chunks
         """
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size or settings.child_chunk_size,
-            chunk_overlap=chunk_overlap or settings.child_chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
+        if chunk_size is None:
+            chunk_size = _CHILD_CHUNK_SIZE
+        if chunk_overlap is None:
+            chunk_overlap = _CHILD_CHUNK_OVERLAP
+        # Built before the fast path so invalid parameters are rejected either way
+        splitter = _get_splitter(chunk_size, chunk_overlap)
+
+        # Text that fits in one chunk needs no splitting; strip it the way the
+        # splitter strips its chunks
+        if len(text) <= chunk_size:
+            text = text.strip()
+            return [text] if text else []
+
         return splitter.split_text(text)
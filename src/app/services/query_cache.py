@@ -0,0 +1,94 @@
+"""In-memory cache of retrieval results matched by exact or semantically similar query."""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """
+    LRU cache of retrieved chunks with a time-to-live per entry.
+
+    Query embeddings live in one preallocated matrix, one row per slot, so a
+    semantic lookup is a single matrix-vector product over every slot with no
+    per-lookup stacking of cached vectors.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        """
+        Create an empty cache.
+
+        Args:
+            maxsize: Maximum number of cached queries
+            ttl: Seconds an entry can be served after it was cached
+            threshold: Cosine similarity above which a cached query's chunks are reused
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        # Cache key -> (slot, retrieved chunks), least recently used first
+        self._entries: OrderedDict[str, tuple[int, list[dict[str, Any]]]] = OrderedDict()
+        # Per-slot state; the vector matrix is allocated on first use, once the
+        # embedding dimension is known
+        self._vectors: np.ndarray | None = None
+        self._keys: list[str | None] = [None] * maxsize
+        self._top_k = np.zeros(maxsize, dtype=np.int64)
+        self._expires = np.zeros(maxsize, dtype=np.float64)
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        """Return the chunks cached under an exact key, unless expired."""
+        entry = self._entries.get(key)
+        if entry is None or self._expires[entry[0]] <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def lookup(self, vector: np.ndarray, top_k: int) -> list[dict[str, Any]] | None:
+        """Return the chunks of the most similar live cached query, if close enough."""
+        if self._vectors is None or not self._entries:
+            return None
+
+        similarities = self._vectors @ vector
+        stale = (self._top_k != top_k) | (self._expires <= time.monotonic())
+        similarities[stale] = -np.inf
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < self.threshold:
+            return None
+
+        key = self._keys[slot]
+        self._entries.move_to_end(key)
+        return self._entries[key][1]
+
+    def put(
+        self,
+        key: str,
+        vector: np.ndarray,
+        top_k: int,
+        results: list[dict[str, Any]],
+    ) -> None:
+        """Cache chunks under a key and query embedding, evicting the oldest entry if full."""
+        if self._vectors is None:
+            self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+
+        if key in self._entries:
+            slot = self._entries.pop(key)[0]
+        elif len(self._entries) < self.maxsize:
+            # Slots are handed out in order and only freed all at once by clear()
+            slot = len(self._entries)
+        else:
+            slot = self._entries.popitem(last=False)[1][0]
+
+        self._entries[key] = (slot, results)
+        self._vectors[slot] = vector
+        self._keys[slot] = key
+        self._top_k[slot] = top_k
+        self._expires[slot] = time.monotonic() + self.ttl
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self._entries.clear()
+        self._keys = [None] * self.maxsize
+        self._top_k[:] = 0
+        self._expires[:] = 0.0
@@ -2,9 +2,10 @@
 
 from typing import Any, AsyncIterator
 
+from cachetools import LRUCache
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnablePassthrough
 
 from app.core.config import settings
@@ -24,6 +25,12 @@ class RAGService:
             streaming=True,
         )
 
+        # Context messages of retrieved chunks keyed by chunk id, so repeated
+        # chunks are sent as identical message fragments
+        self._context_message_cache: LRUCache = LRUCache(
+            maxsize=settings.context_message_cache_size
+        )
+
         # System prompt for grounded responses
         self.system_prompt = """You are a helpful technical support assistant that answers questions based on product manuals and documentation.
 
@@ -36,18 +43,66 @@ Your responses must:
 
 Always ground your answers in the provided context. Do not make up information that isn't in the context."""
 
-        # RAG prompt template
+        # RAG prompt template; each retrieved chunk is its own context message
         self.rag_prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", self.system_prompt),
                 MessagesPlaceholder(variable_name="chat_history"),
+                MessagesPlaceholder(variable_name="context_messages"),
                 (
                     "human",
-                    "Context from documentation:\n{context}\n\nQuestion: {question}\n\nAnswer based on the context above:",
+                    "Question: {question}\n\nAnswer based on the context above:",
                 ),
             ]
         )
 
+    @staticmethod
+    def _convert_history(messages: list[dict[str, str]], query: str) -> list[BaseMessage]:
+        """Convert chat history to LangChain messages, leaving out the current query."""
+        history = messages
+        if history and history[-1]["role"] == "user" and history[-1]["content"] == query:
+            history = history[:-1]
+
+        langchain_messages = []
+        for msg in history:
+            if msg["role"] == "user":
+                langchain_messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                langchain_messages.append(AIMessage(content=msg["content"]))
+        return langchain_messages
+
+    def _build_context(
+        self,
+        retrieved_chunks: list[dict[str, Any]],
+    ) -> tuple[list[SystemMessage], list[dict[str, Any]]]:
+        """Build one context message per retrieved chunk, plus their source citations."""
+        context_messages = []
+        sources = []
+        for chunk in retrieved_chunks:
+            sources.append(
+                {
+                    "document_name": chunk["document_name"],
+                    "page_number": chunk.get("page_number"),
+                    "section_title": chunk.get("section_title"),
+                    "similarity": chunk.get("similarity", 0.0),
+                }
+            )
+
+            chunk_id = chunk.get("id")
+            message = self._context_message_cache.get(chunk_id) if chunk_id else None
+            if message is None:
+                context_text = chunk["content"]
+                if chunk.get("section_title"):
+                    context_text = f"[{chunk['section_title']}]\n{context_text}"
+                message = SystemMessage(
+                    content=f"Context from {chunk['document_name']}:\n{context_text}"
+                )
+                if chunk_id:
+                    self._context_message_cache[chunk_id] = message
+            context_messages.append(message)
+
+        return context_messages, sources
+
     async def generate_stream(
         self,
         messages: list[dict[str, str]],
@@ -66,41 +121,20 @@ Always ground your answers in the provided context. Do not make up information t
         # Retrieve relevant chunks
         retrieved_chunks = await self.vector_service.retrieve_parent_chunks(query)
 
+        # Convert messages to LangChain format
+        langchain_messages = self._convert_history(messages, query)
+
         if not retrieved_chunks:
             yield ("I couldn't find relevant information in the documentation for your question.", [])
             return
 
         # Format context from retrieved chunks
-        context_parts = []
-        sources = []
-        for chunk in retrieved_chunks:
-            source_info = {
-                "document_name": chunk["document_name"],
-                "page_number": chunk.get("page_number"),
-                "section_title": chunk.get("section_title"),
-                "similarity": chunk.get("similarity", 0.0),
-            }
-            sources.append(source_info)
-
-            context_text = chunk["content"]
-            if chunk.get("section_title"):
-                context_text = f"[{chunk['section_title']}]\n{context_text}"
-            context_parts.append(context_text)
-
-        context = "\n\n---\n\n".join(context_parts)
-
-        # Convert messages to LangChain format
-        langchain_messages = []
-        for msg in messages[:-1]:  # Exclude the last message (current query)
-            if msg["role"] == "user":
-                langchain_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                langchain_messages.append(AIMessage(content=msg["content"]))
+        context_messages, sources = self._build_context(retrieved_chunks)
 
         # Build the chain
         chain = (
             {
-                "context": lambda x: context,
+                "context_messages": lambda x: context_messages,
                 "question": lambda x: query,
                 "chat_history": lambda x: langchain_messages,
             }
@@ -108,21 +142,10 @@ Always ground your answers in the provided context. Do not make up information t
             | self.llm
         )
 
-        # Stream the response
-        buffer = ""
-
+        # Stream the response; astream yields non-overlapping deltas
         async for chunk in chain.astream({}):
-            if not chunk.content:
-                continue
-
-            new_text = chunk.content
-
-            if buffer.endswith(new_text):
-                continue
-
-            buffer += new_text
-            yield (new_text, [])
-
+            if chunk.content:
+                yield (chunk.content, [])
 
     async def generate(
         self,
@@ -142,40 +165,19 @@ Always ground your answers in the provided context. Do not make up information t
         # Retrieve relevant chunks
         retrieved_chunks = await self.vector_service.retrieve_parent_chunks(query)
 
+        # Convert messages
+        langchain_messages = self._convert_history(messages, query)
+
         if not retrieved_chunks:
             return ("I couldn't find relevant information in the documentation for your question.", [])
 
         # Format context
-        context_parts = []
-        sources = []
-        for chunk in retrieved_chunks:
-            source_info = {
-                "document_name": chunk["document_name"],
-                "page_number": chunk.get("page_number"),
-                "section_title": chunk.get("section_title"),
-                "similarity": chunk.get("similarity", 0.0),
-            }
-            sources.append(source_info)
-
-            context_text = chunk["content"]
-            if chunk.get("section_title"):
-                context_text = f"[{chunk['section_title']}]\n{context_text}"
-            context_parts.append(context_text)
-
-        context = "\n\n---\n\n".join(context_parts)
-
-        # Convert messages
-        langchain_messages = []
-        for msg in messages[:-1]:
-            if msg["role"] == "user":
-                langchain_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                langchain_messages.append(AIMessage(content=msg["content"]))
+        context_messages, sources = self._build_context(retrieved_chunks)
 
         # Generate response
         chain = (
             {
-                "context": lambda x: context,
+                "context_messages": lambda x: context_messages,
                 "question": lambda x: query,
                 "chat_history": lambda x: langchain_messages,
             }
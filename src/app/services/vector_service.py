@@ -1,94 +1,546 @@
 """Vector service for Neon DB interactions with ParentDocumentRetriever pattern."""
 
-import json
+import asyncio
+import hashlib
 import uuid
-from typing import Any
+from collections import OrderedDict
+from typing import Any, ClassVar
 
 import asyncpg
-from langchain_core.embeddings import Embeddings
-from langchain_huggingface import HuggingFaceEmbeddings
+import numpy as np
+import orjson
+from pgvector import HalfVector, Vector
+from pgvector.asyncpg import register_vector
 
 from app.core.config import settings
+from app.services.embedding_cache import (
+    content_hash,
+    get_cached_embeddings,
+    put_cached_embeddings,
+)
+from app.services.embeddings import SentenceTransformerEmbeddings
+from app.services.query_cache import SemanticQueryCache
+
+# Bump whenever the schema DDL below changes so existing databases are migrated
+SCHEMA_VERSION = 3
+
+# Sentence-transformers model used for all embeddings
+EMBEDDING_MODEL = "all-mpnet-base-v2"
+
+# Number of texts the embedding model encodes per forward pass
+EMBED_BATCH_SIZE = 64
+
+# Query embeddings kept in memory; they stay valid across corpus changes
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# Child chunks fetched per requested parent, since several children can share a parent
+CANDIDATE_MULTIPLIER = 4
+
+# pgvector column type and inner product operator class per embedding precision;
+# embeddings are unit-normalized, so inner product ranks the same as cosine
+VECTOR_TYPES = {
+    "fp32": ("vector", "vector_ip_ops"),
+    "fp16": ("halfvec", "halfvec_ip_ops"),
+}
+
+
+# Version byte that prefixes JSONB values in PostgreSQL's binary wire format
+JSONB_BINARY_VERSION = b"\x01"
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    """Serialize a value to binary JSONB for the JSONB codec."""
+    return JSONB_BINARY_VERSION + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    """Parse a binary JSONB value, skipping its version byte."""
+    return orjson.loads(data[1:])
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Register binary pgvector codecs and a binary JSONB codec on a new pool connection."""
+    await register_vector(conn)
+    await conn.set_type_codec(
+        "jsonb",
+        schema="pg_catalog",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        format="binary",
+    )
+
+
+def _decode_metadata(value: Any) -> dict[str, Any]:
+    """Return row metadata as a dict, parsing JSON text that no JSONB codec decoded."""
+    if isinstance(value, (str, bytes)):
+        return orjson.loads(value)
+    return value or {}
+
+
+def _parent_chunk(row: asyncpg.Record, similarity: float) -> dict[str, Any]:
+    """Convert a retrieval row to a parent chunk, dropping the candidate embedding."""
+    chunk = dict(row)
+    del chunk["embedding"]
+    chunk.pop("query_index", None)
+    chunk["id"] = str(chunk["id"])
+    chunk["metadata"] = _decode_metadata(chunk["metadata"])
+    chunk["similarity"] = similarity
+    return chunk
+
+
+def _rerank(
+    rows: list[asyncpg.Record],
+    query_embedding: np.ndarray,
+    top_k: int,
+) -> list[dict[str, Any]]:
+    """Rerank candidate rows by exact cosine similarity, keeping the best child per parent."""
+    if not rows:
+        return []
+
+    # Score all candidates in a single matrix-vector product
+    candidates = np.stack([row["embedding"].to_numpy() for row in rows]).astype(np.float32)
+    norms = np.linalg.norm(candidates, axis=1)
+    similarities = candidates @ query_embedding / np.maximum(norms, 1e-12)
+
+    best: dict[Any, int] = {}
+    for idx in np.argsort(-similarities):
+        best.setdefault(rows[idx]["id"], int(idx))
+        if len(best) == top_k:
+            break
+
+    return [_parent_chunk(rows[idx], float(similarities[idx])) for idx in best.values()]
+
+
+def tune_hnsw(row_count: int) -> tuple[int, int, int]:
+    """
+    Pick HNSW parameters for the number of indexed embeddings.
+
+    Larger corpora need denser graphs and wider candidate lists to keep
+    recall up, at the cost of slower builds and queries.
+
+    Args:
+        row_count: Number of rows in child_chunks
+
+    Returns:
+        Tuple of (m, ef_construction, ef_search)
+    """
+    if row_count < 100_000:
+        return 16, 64, 40
+    if row_count < 1_000_000:
+        return 24, 128, 80
+    return 32, 200, 120
 
 
 class VectorService:
     """Service for managing vector embeddings and parent-child chunk retrieval."""
 
+    # Finds the nearest child chunks through the vector index first, then their
+    # parent chunks; kept as one constant text so asyncpg's per-connection
+    # statement cache reuses the prepared statement on every retrieval
+    _RETRIEVE_SQL: ClassVar[str] = """
+        WITH nearest AS (
+            SELECT parent_id, embedding
+            FROM child_chunks
+            ORDER BY embedding <#> $1
+            LIMIT $2
+        )
+        SELECT
+            p.id,
+            p.document_name,
+            p.content,
+            p.page_number,
+            p.section_title,
+            p.metadata,
+            n.embedding
+        FROM nearest n
+        JOIN parent_chunks p ON p.id = n.parent_id
+    """
+
     def __init__(self):
         """Initialize the vector service."""
         self.pool: asyncpg.Pool | None = None
-        self.embeddings: Embeddings | None = None
+        self.embeddings: SentenceTransformerEmbeddings | None = None
+        # sentence-transformers multi-process pool used to embed documents, if enabled
+        self._encode_pool: dict[str, Any] | None = None
+        self.vector_type, self.vector_ops = VECTOR_TYPES[settings.embedding_precision]
+        self._vector_class = HalfVector if self.vector_type == "halfvec" else Vector
+        # Batched form of _RETRIEVE_SQL: one index scan per query, joined laterally
+        self._retrieve_many_sql = f"""
+            SELECT
+                q.query_index,
+                p.id,
+                p.document_name,
+                p.content,
+                p.page_number,
+                p.section_title,
+                p.metadata,
+                n.embedding
+            FROM unnest($1::int[], $2::{self.vector_type}[]) AS q(query_index, embedding)
+            CROSS JOIN LATERAL (
+                SELECT c.parent_id, c.embedding
+                FROM child_chunks c
+                ORDER BY c.embedding <#> q.embedding
+                LIMIT $3
+            ) n
+            JOIN parent_chunks p ON p.id = n.parent_id
+        """
+        self.ef_search = settings.hnsw_ef_search
+        # Recent retrievals keyed by normalized query and top_k, also matched by
+        # query embedding; entries expire so chunks ingested by other processes
+        # (arq workers) show up without a restart
+        self._query_cache = SemanticQueryCache(
+            maxsize=settings.semantic_cache_size,
+            ttl=settings.semantic_cache_ttl,
+            threshold=settings.semantic_cache_threshold,
+        )
+        # Unit-normalized embeddings of recent raw query strings
+        self._query_embedding_cache: OrderedDict[str, np.ndarray] = OrderedDict()
 
     async def initialize(self) -> None:
         """Initialize database connection pool and embedding model."""
-        # Create connection pool
+        # Ensure database schema exists; the pgvector types must exist before
+        # pool connections can register their binary codecs
+        await self._ensure_schema()
+
+        # Create connection pool, routed through Neon's PgBouncer pooler when configured.
+        # A few connections are opened up front and burst connections are reused while
+        # traffic lasts, then closed once idle so a quiet Neon compute can scale down.
+        # asyncpg's per-connection statement cache keeps the hot queries prepared
+        # (Neon's pooler supports protocol-level prepared statements)
         self.pool = await asyncpg.create_pool(
-            settings.neon_db_url,
-            min_size=1,
+            settings.neon_pooled_url or settings.neon_db_url,
+            min_size=min(settings.neon_db_pool_min_size, settings.neon_db_pool_size),
             max_size=settings.neon_db_pool_size,
+            max_inactive_connection_lifetime=settings.neon_db_pool_idle_timeout,
+            statement_cache_size=1024,
+            max_cacheable_statement_size=64 * 1024,
+            command_timeout=settings.neon_db_command_timeout,
+            init=_init_connection,
         )
 
+        # Give the embedding model's intra-op thread pool a fixed size
+        if settings.embedding_threads:
+            import torch
+
+            torch.set_num_threads(settings.embedding_threads)
+
         # Initialize embedding model
-        # Using HuggingFace embeddings as a default (can be swapped for OpenAI/Cohere)
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="all-mpnet-base-v2",
-            model_kwargs={"device": "cpu"},
+        model_kwargs = None
+        if settings.embedding_backend == "onnx" and settings.embedding_onnx_file:
+            model_kwargs = {"file_name": settings.embedding_onnx_file}
+        self.embeddings = SentenceTransformerEmbeddings(
+            EMBEDDING_MODEL,
+            device=settings.embedding_device,
+            backend=settings.embedding_backend,
+            model_kwargs=model_kwargs,
+            batch_size=EMBED_BATCH_SIZE,
         )
 
-        # Ensure database schema exists
-        await self._ensure_schema()
+        # Shard document embedding across CPU cores for large ingestions
+        if settings.embedding_workers:
+            self._encode_pool = self.embeddings.start_multi_process_pool(
+                target_devices=["cpu"] * settings.embedding_workers
+            )
+
+        # Run one forward pass now so the first query doesn't pay for lazy model
+        # initialization (embed_batch could be served from the embedding cache instead)
+        if settings.startup_warmup:
+            await asyncio.to_thread(self.embeddings.embed_query, "warmup")
 
     async def _ensure_schema(self) -> None:
-        """Create database tables and indexes if they don't exist."""
-        async with self.pool.acquire() as conn:
-            # Enable pgvector extension
-            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        """Create database tables and indexes unless the schema is already up to date."""
+        # DDL goes over a direct connection rather than the (possibly pooled) pool
+        conn = await asyncpg.connect(settings.neon_db_url)
+        try:
+            # Size the HNSW graph for the current corpus (reltuples is -1 before
+            # the first ANALYZE); the configured ef_search acts as a floor
+            row_count = await conn.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('child_chunks')"
+            )
+            m, ef_construction, ef_search = tune_hnsw(max(row_count or 0, 0))
+            self.ef_search = max(settings.hnsw_ef_search, ef_search)
+
+            # Skip all DDL and its catalog locks when the stored version matches.
+            # m and ef_construction only apply when the index is first built;
+            # rebuild_hnsw_index moves an existing index to a new tier
+            version = f"{SCHEMA_VERSION}:{self.vector_type}({settings.embedding_dimension})"
+            if await self._schema_version(conn) == version:
+                return
+
+            async with conn.transaction():
+                # Workers booting together take turns; whoever waited re-checks the
+                # version and skips the DDL the first worker already applied
+                await conn.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext('vector_service_schema'))"
+                )
+                if await self._schema_version(conn) == version:
+                    return
+
+                await self._apply_schema(conn, m, ef_construction)
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_meta (
+                        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                        version TEXT NOT NULL
+                    )
+                    """
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO schema_meta (version) VALUES ($1)
+                    ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version
+                    """,
+                    version,
+                )
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def _schema_version(conn: asyncpg.Connection) -> str | None:
+        """Return the stored schema version, or None before the first migration."""
+        # Checked up front, since a failed query would abort an enclosing transaction
+        if await conn.fetchval("SELECT to_regclass('schema_meta')") is None:
+            return None
+        return await conn.fetchval("SELECT version FROM schema_meta")
+
+    async def _apply_schema(
+        self,
+        conn: asyncpg.Connection,
+        m: int,
+        ef_construction: int,
+    ) -> None:
+        """Run the schema DDL inside the caller's transaction, migrating as needed."""
+        # Enable pgvector extension
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+        # Create parent_chunks table
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parent_chunks (
+                id UUID PRIMARY KEY,
+                document_name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                page_number INTEGER,
+                section_title TEXT,
+                metadata JSONB,
+                content_hash TEXT,
+                created_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+
+        # Tag parent chunks with the content hash of their upload, so the rows of
+        # an interrupted ingestion can be found and removed before a retry
+        await conn.execute("ALTER TABLE parent_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT")
+        await conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS parent_chunks_content_hash_idx
+            ON parent_chunks(content_hash)
+            """
+        )
+
+        # Create child_chunks table with vector column
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS child_chunks (
+                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                parent_id UUID NOT NULL REFERENCES parent_chunks(id) ON DELETE CASCADE,
+                content TEXT NOT NULL,
+                embedding {self.vector_type}({settings.embedding_dimension}),
+                metadata JSONB,
+                created_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
 
-            # Create parent_chunks table
+        # Cache embeddings by content hash so unchanged chunks are never re-embedded.
+        # Stored at full precision, so it is independent of embedding_precision
+        await conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                embedding vector({settings.embedding_dimension}) NOT NULL,
+                PRIMARY KEY (hash, model)
+            )
+            """
+        )
+
+        # Convert the embedding column when the configured precision changed;
+        # the index is built for a single column type, so it is rebuilt below
+        column_type = await conn.fetchval(
+            """
+            SELECT format_type(atttypid, atttypmod)
+            FROM pg_attribute
+            WHERE attrelid = 'child_chunks'::regclass AND attname = 'embedding'
+            """
+        )
+        target_type = f"{self.vector_type}({settings.embedding_dimension})"
+        if column_type != target_type:
+            await conn.execute("DROP INDEX IF EXISTS child_chunks_embedding_ip_idx")
             await conn.execute(
+                f"""
+                ALTER TABLE child_chunks
+                ALTER COLUMN embedding TYPE {target_type}
+                USING embedding::{target_type}
                 """
-                CREATE TABLE IF NOT EXISTS parent_chunks (
-                    id UUID PRIMARY KEY,
-                    document_name TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    page_number INTEGER,
-                    section_title TEXT,
-                    metadata JSONB,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
+            )
+
+        # Create vector similarity index, replacing the earlier IVFFlat and cosine
+        # HNSW indexes. Building with enough maintenance memory keeps the graph
+        # from spilling to disk
+        await conn.execute("DROP INDEX IF EXISTS child_chunks_embedding_idx")
+        await conn.execute("DROP INDEX IF EXISTS child_chunks_embedding_hnsw_idx")
+        await conn.execute(
+            f"SET LOCAL maintenance_work_mem = '{settings.index_maintenance_work_mem}'"
+        )
+        await conn.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS child_chunks_embedding_ip_idx
+            ON child_chunks
+            USING hnsw (embedding {self.vector_ops})
+            WITH (m = {m}, ef_construction = {ef_construction})
+            """
+        )
+
+        # Create index on parent_id for faster lookups
+        await conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS child_chunks_parent_id_idx
+            ON child_chunks(parent_id)
+            """
+        )
+
+        # Create documents table used to claim ingestion of each upload once
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                document_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                job_id TEXT,
+                updated_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+
+    async def rebuild_hnsw_index(self) -> bool:
+        """
+        Rebuild the HNSW index with the parameters tuned for the current corpus.
+
+        A maintenance step run by hand, never at startup: the replacement index
+        is built concurrently, so retrieval and ingestion keep running while the
+        graph is built, and the old index is only dropped once it is ready.
+
+        Returns:
+            True if the index was rebuilt, False if it already had the tuned parameters
+        """
+        conn = await asyncpg.connect(settings.neon_db_url)
+        try:
+            row_count = await conn.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('child_chunks')"
+            )
+            m, ef_construction, _ = tune_hnsw(max(row_count or 0, 0))
+            index_options = await conn.fetchval(
+                """
+                SELECT reloptions FROM pg_class
+                WHERE oid = to_regclass('child_chunks_embedding_ip_idx')
                 """
             )
+            if sorted(index_options or []) == sorted(
+                [f"m={m}", f"ef_construction={ef_construction}"]
+            ):
+                return False
 
-            # Create child_chunks table with vector column
+            # CONCURRENTLY can't run inside a transaction block, so each statement
+            # runs on its own; an invalid index left by an interrupted run goes first
+            await conn.execute(
+                f"SET maintenance_work_mem = '{settings.index_maintenance_work_mem}'"
+            )
+            await conn.execute("DROP INDEX CONCURRENTLY IF EXISTS child_chunks_embedding_new_idx")
             await conn.execute(
                 f"""
-                CREATE TABLE IF NOT EXISTS child_chunks (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    parent_id UUID NOT NULL REFERENCES parent_chunks(id) ON DELETE CASCADE,
-                    content TEXT NOT NULL,
-                    embedding vector({settings.embedding_dimension}),
-                    metadata JSONB,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
+                CREATE INDEX CONCURRENTLY child_chunks_embedding_new_idx
+                ON child_chunks
+                USING hnsw (embedding {self.vector_ops})
+                WITH (m = {m}, ef_construction = {ef_construction})
                 """
             )
-
-            # Create vector similarity index
+            await conn.execute("DROP INDEX CONCURRENTLY IF EXISTS child_chunks_embedding_ip_idx")
             await conn.execute(
+                "ALTER INDEX child_chunks_embedding_new_idx RENAME TO child_chunks_embedding_ip_idx"
+            )
+            return True
+        finally:
+            await conn.close()
+
+    async def try_claim_document(
+        self,
+        content_hash: str,
+        document_name: str,
+        job_id: str | None = None,
+    ) -> bool:
+        """
+        Atomically claim ingestion of a document by its content hash.
+
+        A document can be claimed if it was never seen, if its last ingestion
+        failed, or if a previous ingestion has been running for too long to
+        still be alive.
+
+        Args:
+            content_hash: Hash of the raw file content
+            document_name: Name of the uploaded file
+            job_id: Identifier of the job that will ingest the document
+
+        Returns:
+            True if the caller should ingest the document
+        """
+        async with self.pool.acquire() as conn:
+            claimed = await conn.fetchval(
                 """
-                CREATE INDEX IF NOT EXISTS child_chunks_embedding_idx
-                ON child_chunks
-                USING ivfflat (embedding vector_cosine_ops)
-                WITH (lists = 100)
+                INSERT INTO documents (content_hash, document_name, status, job_id, updated_at)
+                VALUES ($1, $2, 'running', $3, NOW())
+                ON CONFLICT (content_hash) DO UPDATE SET
+                    document_name = EXCLUDED.document_name,
+                    status = 'running',
+                    job_id = EXCLUDED.job_id,
+                    updated_at = NOW()
+                WHERE documents.status = 'failed'
+                    OR (
+                        documents.status = 'running'
+                        AND documents.updated_at < NOW() - INTERVAL '15 minutes'
+                    )
+                RETURNING content_hash
+                """,
+                content_hash,
+                document_name,
+                job_id,
+            )
+            return claimed is not None
+
+    async def get_document(self, content_hash: str) -> dict[str, Any] | None:
+        """Get the ingestion record of a document by its content hash."""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
                 """
+                SELECT content_hash, document_name, status, job_id
+                FROM documents
+                WHERE content_hash = $1
+                """,
+                content_hash,
             )
+            return dict(row) if row else None
 
-            # Create index on parent_id for faster lookups
+    async def set_document_status(self, content_hash: str, status: str) -> None:
+        """Record the ingestion status of a document."""
+        async with self.pool.acquire() as conn:
             await conn.execute(
                 """
-                CREATE INDEX IF NOT EXISTS child_chunks_parent_id_idx
-                ON child_chunks(parent_id)
-                """
+                UPDATE documents SET status = $2, updated_at = NOW()
+                WHERE content_hash = $1
+                """,
+                content_hash,
+                status,
             )
 
     async def store_parent_chunk(
@@ -99,13 +551,15 @@ class VectorService:
         page_number: int | None = None,
         section_title: str | None = None,
         metadata: dict[str, Any] | None = None,
+        content_hash: str | None = None,
     ) -> None:
         """Store a parent chunk in the database."""
         async with self.pool.acquire() as conn:
             await conn.execute(
                 """
-                INSERT INTO parent_chunks (id, document_name, content, page_number, section_title, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6)
+                INSERT INTO parent_chunks
+                    (id, document_name, content, page_number, section_title, metadata, content_hash)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
                 ON CONFLICT (id) DO UPDATE SET
                     content = EXCLUDED.content,
                     metadata = EXCLUDED.metadata
@@ -115,9 +569,58 @@ class VectorService:
                 content,
                 page_number,
                 section_title,
-                json.dumps(metadata) if metadata else None,
+                metadata,
+                content_hash,
             )
 
+    async def delete_document_chunks(self, content_hash: str) -> None:
+        """Delete the chunks stored by earlier ingestions of an upload."""
+        self._query_cache.clear()
+        async with self.pool.acquire() as conn:
+            # Child chunks follow through ON DELETE CASCADE
+            await conn.execute("DELETE FROM parent_chunks WHERE content_hash = $1", content_hash)
+
+    async def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed many texts at once, reusing cached embeddings of previously seen texts.
+
+        Texts missing from the embedding cache are embedded in one model call,
+        then added to the cache.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one embedding row per input text, in input order
+        """
+        if not self.embeddings:
+            raise RuntimeError("Embeddings not initialized")
+
+        if not texts:
+            return np.empty((0, settings.embedding_dimension), dtype=np.float32)
+
+        hashes = [content_hash(text) for text in texts]
+        cached = await get_cached_embeddings(self.pool, self.embeddings.cache_key, hashes)
+
+        # Embed each uncached text once, even if it repeats within the batch
+        missing = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        if missing:
+            embedded = dict(zip(missing, await self._embed_documents(list(missing.values()))))
+            cached.update(embedded)
+            await put_cached_embeddings(self.pool, self.embeddings.cache_key, embedded)
+
+        return np.stack([cached[h] for h in hashes]).astype(np.float32, copy=False)
+
+    async def _embed_documents(self, texts: list[str]) -> np.ndarray:
+        """Embed texts on the worker process pool if enabled, otherwise in a worker thread."""
+        if self._encode_pool is not None:
+            return await asyncio.to_thread(
+                self.embeddings.encode_multi_process, texts, self._encode_pool
+            )
+
+        # The model batches internally, so hand it the whole list at once
+        return await self.embeddings.aembed_documents(texts)
+
     async def store_child_chunks(
         self,
         parent_id: uuid.UUID,
@@ -129,25 +632,42 @@ class VectorService:
             raise RuntimeError("Embeddings not initialized")
 
         # Generate embeddings for all child chunks
-        embeddings_list = await self.embeddings.aembed_documents(child_chunks)
+        embeddings_list = await self.embed_batch(child_chunks)
+
+        # Insert them in one batched round-trip rather than one INSERT per chunk
+        await self.bulk_store_child_chunks(
+            [
+                (parent_id, content, embedding, metadata)
+                for content, embedding in zip(child_chunks, embeddings_list)
+            ]
+        )
+
+    async def bulk_store_child_chunks(
+        self,
+        rows: list[tuple[uuid.UUID, str, np.ndarray, dict[str, Any] | None]],
+    ) -> None:
+        """
+        Store precomputed child chunks in a single batched insert.
+
+        Args:
+            rows: Tuples of (parent_id, content, embedding, metadata)
+        """
+        if not rows:
+            return
 
+        # New chunks can change the answer to any cached query
+        self._query_cache.clear()
+
+        # Rows are bound as-is: embeddings go out in pgvector's binary format and
+        # metadata dicts through the connection's JSONB codec
         async with self.pool.acquire() as conn:
-            # Insert all child chunks in a transaction
-            async with conn.transaction():
-                for content, embedding in zip(child_chunks, embeddings_list):
-                    # Convert embedding to PostgreSQL vector format
-                    embedding_str = "[" + ",".join(map(str, embedding)) + "]"
-
-                    await conn.execute(
-                        """
-                        INSERT INTO child_chunks (parent_id, content, embedding, metadata)
-                        VALUES ($1, $2, $3::vector, $4)
-                        """,
-                        parent_id,
-                        content,
-                        embedding_str,
-                        json.dumps(metadata) if metadata else None,
-                    )
+            await conn.executemany(
+                """
+                INSERT INTO child_chunks (parent_id, content, embedding, metadata)
+                VALUES ($1, $2, $3, $4)
+                """,
+                rows,
+            )
 
     async def retrieve_parent_chunks(
         self,
@@ -169,56 +689,149 @@ class VectorService:
 
         top_k = top_k or settings.top_k_retrieval
 
-        # Generate query embedding
+        # Exact repeats skip both the embedding model and the database
+        normalized = " ".join(query.lower().split())
+        key = hashlib.sha256(f"{top_k}\n{normalized}".encode()).hexdigest()
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        vector = await self._embed_query_cached(query)
+
+        # Near-identical questions reuse the chunks of the closest cached query,
+        # so only a miss checks out a connection
+        results = self._query_cache.lookup(vector, top_k)
+        if results is None:
+            async with self.pool.acquire() as conn:
+                results = await self._search_parent_chunks(conn, vector, top_k)
+
+        if results:
+            self._query_cache.put(key, vector, top_k, results)
+
+        return results
+
+    async def _embed_query_cached(self, query: str) -> np.ndarray:
+        """Embed a query, reusing the embedding of an identical earlier query."""
+        vector = self._query_embedding_cache.get(query)
+        if vector is not None:
+            self._query_embedding_cache.move_to_end(query)
+            return vector
+
         query_embedding = await self.embeddings.aembed_query(query)
-        embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+
+        self._query_embedding_cache[query] = vector
+        if len(self._query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            self._query_embedding_cache.popitem(last=False)
+        return vector
+
+    def _ef_search_for(self, limit: int) -> int:
+        """Return the HNSW candidate list size for a search returning up to limit rows."""
+        # An HNSW scan returns at most ef_search rows, so a smaller list would
+        # silently cut the over-fetched candidates short
+        return max(self.ef_search, limit)
+
+    async def _search_parent_chunks(
+        self,
+        conn: asyncpg.Connection,
+        query_embedding: np.ndarray,
+        top_k: int,
+    ) -> list[dict[str, Any]]:
+        """
+        Find the parent chunks of the child chunks nearest to a query embedding.
+
+        The vector index over-fetches candidate child chunks, which are then
+        reranked by exact cosine similarity in a single matrix-vector product.
 
+        Args:
+            conn: Pool connection to search on
+            query_embedding: Unit-normalized float32 query embedding
+            top_k: Number of parent chunks to return
+
+        Returns:
+            Parent chunks ordered by the similarity of their best child chunk
+        """
+        limit = top_k * CANDIDATE_MULTIPLIER
+        async with conn.transaction():
+            # Size the HNSW candidate list for this query only, and skip JIT
+            # compilation, which costs more than it saves on a short index scan
+            # (set per transaction, since PgBouncer rejects startup settings)
+            await conn.execute(
+                f"SET LOCAL hnsw.ef_search = {self._ef_search_for(limit)}; SET LOCAL jit = off"
+            )
+
+            rows = await conn.fetch(self._RETRIEVE_SQL, query_embedding, limit)
+
+        return _rerank(rows, query_embedding, top_k)
+
+    async def retrieve_parent_chunks_many(
+        self,
+        queries: list[str],
+        top_k: int | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Retrieve parent chunks for several queries at once.
+
+        All queries are embedded in one model call and searched in one round
+        trip, each through the vector index. Unlike retrieve_parent_chunks,
+        the query caches are bypassed.
+
+        Args:
+            queries: User query strings
+            top_k: Number of chunks to retrieve per query (defaults to config value)
+
+        Returns:
+            One list of parent chunks per query, in query order
+        """
+        if not self.embeddings:
+            raise RuntimeError("Embeddings not initialized")
+
+        if not queries:
+            return []
+
+        top_k = top_k or settings.top_k_retrieval
+
+        vectors = np.asarray(await self.embeddings.aembed_documents(queries), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        limit = top_k * CANDIDATE_MULTIPLIER
         async with self.pool.acquire() as conn:
-            # Find most similar child chunks, then retrieve their parent chunks
-            rows = await conn.fetch(
-                """
-                SELECT DISTINCT ON (p.id)
-                    p.id,
-                    p.document_name,
-                    p.content,
-                    p.page_number,
-                    p.section_title,
-                    p.metadata,
-                    1 - (c.embedding <=> $1::vector) as similarity
-                FROM child_chunks c
-                JOIN parent_chunks p ON c.parent_id = p.id
-                ORDER BY p.id, c.embedding <=> $1::vector
-                LIMIT $2
-                """,
-                embedding_str,
-                top_k,
-            )
-
-            results = []
-            for row in rows:
-                results.append(
-                    {
-                        "id": str(row["id"]),
-                        "document_name": row["document_name"],
-                        "content": row["content"],
-                        "page_number": row["page_number"],
-                        "section_title": row["section_title"],
-                        "metadata": json.loads(row["metadata"]) if row["metadata"] else {},
-                        "similarity": float(row["similarity"]),
-                    }
+            async with conn.transaction():
+                await conn.execute(
+                    f"SET LOCAL hnsw.ef_search = {self._ef_search_for(limit)}; SET LOCAL jit = off"
+                )
+                rows = await conn.fetch(
+                    self._retrieve_many_sql,
+                    list(range(len(queries))),
+                    [self._vector_class(vector) for vector in vectors],
+                    limit,
                 )
 
-            return results
+        candidates: list[list[asyncpg.Record]] = [[] for _ in queries]
+        for row in rows:
+            candidates[row["query_index"]].append(row)
+        return [_rerank(group, vector, top_k) for group, vector in zip(candidates, vectors)]
 
     async def delete_document(self, document_name: str) -> None:
         """Delete all chunks associated with a document."""
+        self._query_cache.clear()
         async with self.pool.acquire() as conn:
-            await conn.execute(
-                "DELETE FROM parent_chunks WHERE document_name = $1",
-                document_name,
-            )
+            async with conn.transaction():
+                await conn.execute(
+                    "DELETE FROM parent_chunks WHERE document_name = $1",
+                    document_name,
+                )
+                # Forget the ingestion record so the document can be uploaded again
+                await conn.execute(
+                    "DELETE FROM documents WHERE document_name = $1",
+                    document_name,
+                )
 
     async def close(self) -> None:
-        """Close the database connection pool."""
+        """Close the database connection pool and embedding workers."""
+        if self._encode_pool is not None:
+            self.embeddings.stop_multi_process_pool(self._encode_pool)
+            self._encode_pool = None
         if self.pool:
             await self.pool.close()
@@ -0,0 +1,94 @@
+"""arq worker for background document ingestion."""
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+from arq.connections import RedisSettings
+from arq.jobs import Job, JobStatus
+
+from app.core.config import settings
+from app.services.ingestion_service import IngestionService
+from app.services.vector_service import VectorService
+
+
+async def startup(ctx: dict[str, Any]) -> None:
+    """Initialize services shared by all jobs of this worker."""
+    vector_service = VectorService()
+    await vector_service.initialize()
+    ctx["vector_service"] = vector_service
+    ctx["ingestion_service"] = IngestionService(vector_service)
+
+
+async def shutdown(ctx: dict[str, Any]) -> None:
+    """Release worker resources."""
+    await ctx["vector_service"].close()
+
+
+async def ingest_job(
+    ctx: dict[str, Any],
+    file_path: str,
+    filename: str,
+    content_hash: str | None = None,
+) -> dict[str, Any]:
+    """
+    Ingest an uploaded PDF that was persisted to disk by the API.
+
+    Args:
+        ctx: arq job context
+        file_path: Path of the persisted upload
+        filename: Original name of the uploaded file
+        content_hash: Hash under which the upload was claimed
+
+    Returns:
+        Dictionary with processing results
+    """
+    path = Path(file_path)
+    try:
+        file_obj = path.open("rb")
+    except FileNotFoundError:
+        # The upload is gone, e.g. an earlier run of this job already finished with it
+        if content_hash:
+            await ctx["vector_service"].set_document_status(content_hash, "failed")
+        return {"filename": filename, "status": "failed", "error": "Uploaded file is missing"}
+
+    try:
+        with file_obj:
+            result = await ctx["ingestion_service"].process_document(
+                file_obj, filename, content_hash
+            )
+    except asyncio.CancelledError:
+        # Cancelled by the job timeout, an abort or a worker shutdown; only arq
+        # knows which, so after_job_end decides whether the upload is still needed
+        ctx["cancelled_upload"] = path
+        raise
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    path.unlink(missing_ok=True)
+    return result
+
+
+async def after_job_end(ctx: dict[str, Any]) -> None:
+    """Delete the upload of a cancelled job unless arq is going to run it again."""
+    path = ctx.get("cancelled_upload")
+    if path is None:
+        return
+
+    # A job cancelled by a worker shutdown goes back to the queue; one that timed
+    # out or was aborted is recorded as failed and never runs again
+    status = await Job(ctx["job_id"], ctx["redis"]).status()
+    if status not in (JobStatus.queued, JobStatus.deferred):
+        path.unlink(missing_ok=True)
+
+
+class WorkerSettings:
+    """arq worker configuration."""
+
+    functions = [ingest_job]
+    on_startup = startup
+    on_shutdown = shutdown
+    after_job_end = after_job_end
+    redis_settings = RedisSettings.from_dsn(settings.redis_url or "redis://localhost:6379")
+    job_timeout = settings.ingest_job_timeout
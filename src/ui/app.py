@@ -1,10 +1,11 @@
 """Streamlit frontend application."""
 
-import json
 import os
 
 import httpx
+import orjson
 import streamlit as st
+from httpx_sse import EventSource
 
 from src.ui.components.chat_interface import render_chat_history, render_chat_message
 from src.ui.components.source_citations import render_sources
@@ -53,14 +54,26 @@ if "sources" not in st.session_state:
 
 # Configuration
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
-STREAM_ENDPOINT = f"{API_BASE_URL}/api/v1/chat/stream"
-UPLOAD_ENDPOINT = f"{API_BASE_URL}/api/v1/ingestion/upload"
+STREAM_ENDPOINT = "/api/v1/chat/stream"
+UPLOAD_ENDPOINT = "/api/v1/ingestion/upload"
+
+# Reuse keep-alive connections to the API across reruns of this session
+if "http" not in st.session_state:
+    st.session_state.http = httpx.Client(
+        base_url=API_BASE_URL,
+        timeout=120.0,
+        limits=httpx.Limits(max_keepalive_connections=8),
+    )
+http_client: httpx.Client = st.session_state.http
 
-# Sidebar for document upload
-with st.sidebar:
-    st.header("Document Management")
-    st.markdown("Upload product manuals in PDF format to add them to the knowledge base.")
 
+@st.fragment
+def render_upload_panel() -> None:
+    """Render the document upload form.
+
+    Runs as a fragment so choosing a file or uploading it only reruns this
+    panel instead of the whole chat page and its history.
+    """
     uploaded_file = st.file_uploader(
         "Choose a PDF file",
         type=["pdf"],
@@ -72,16 +85,27 @@ with st.sidebar:
             with st.spinner("Uploading document..."):
                 try:
                     files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
-                    response = httpx.post(UPLOAD_ENDPOINT, files=files, timeout=30.0)
+                    response = http_client.post(UPLOAD_ENDPOINT, files=files, timeout=30.0)
 
                     if response.status_code == 202:
                         st.success(f"{uploaded_file.name} uploaded successfully!")
                         st.info("Document is being processed in the background. It will be available shortly.")
+                    elif response.status_code == 200:
+                        # The same file was uploaded before and isn't processed again
+                        st.info(response.json()["message"])
                     else:
                         st.error(f"Upload failed: {response.text}")
                 except Exception as e:
                     st.error(f"Error uploading file: {str(e)}")
 
+
+# Sidebar for document upload
+with st.sidebar:
+    st.header("Document Management")
+    st.markdown("Upload product manuals in PDF format to add them to the knowledge base.")
+
+    render_upload_panel()
+
     st.markdown("---")
     st.markdown("### About")
     st.markdown(
@@ -121,44 +145,29 @@ if prompt := st.chat_input("Ask about the product..."):
             }
 
             # Use streaming context safely
-            with httpx.stream("POST", STREAM_ENDPOINT, json=chat_request, timeout=120.0) as response:
+            with http_client.stream("POST", STREAM_ENDPOINT, json=chat_request) as response:
                 if response.status_code != 200:
                     message_placeholder.markdown(f"API Error: Status code {response.status_code}")
                 else:
-                    buffer = ""
-                    # Iterate over streamed lines
-                    for line in response.iter_lines():
-                        if not line:
-                            # Empty line indicates end of SSE event
-                            if buffer:
-                                event_data = None
-                                # Extract JSON data from SSE
-                                for event_line in buffer.strip().split("\n"):
-                                    if event_line.startswith("data: "):
-                                        try:
-                                            event_data = json.loads(event_line[6:])
-                                        except json.JSONDecodeError:
-                                            continue
-
-                                if event_data:
-                                    event_type = event_data.get("type")
-                                    if event_type == "chunk":
-                                        chunk = event_data.get("content", "")
-                                        full_response += chunk
-                                        message_placeholder.markdown(full_response + "▌")
-                                    elif event_type == "sources":
-                                        sources = event_data.get("sources", [])
-                                        st.session_state.sources = sources
-                                    elif event_type == "done":
-                                        message_placeholder.markdown(full_response)
-                                    elif event_type == "error":
-                                        st.error(event_data.get("message", "Unknown error"))
-
-                                buffer = ""
+                    # Parse server-sent events straight off the response stream
+                    for event in EventSource(response).iter_sse():
+                        try:
+                            event_data = orjson.loads(event.data)
+                        except orjson.JSONDecodeError:
                             continue
 
-                        # Accumulate line
-                        buffer += line + "\n"
+                        event_type = event_data.get("type")
+                        if event_type == "chunk":
+                            chunk = event_data.get("content", "")
+                            full_response += chunk
+                            message_placeholder.markdown(full_response + "▌")
+                        elif event_type == "sources":
+                            sources = event_data.get("sources", [])
+                            st.session_state.sources = sources
+                        elif event_type == "done":
+                            message_placeholder.markdown(full_response)
+                        elif event_type == "error":
+                            st.error(event_data.get("message", "Unknown error"))
 
         except httpx.ReadTimeout:
             st.warning("Request timed out. Partial response received.")
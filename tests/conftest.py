@@ -13,6 +13,10 @@ class MockVectorService:
         self.search = AsyncMock(return_value=[])
         # Mock ingest to return True
         self.ingest_text = AsyncMock(return_value=True)
+        # Mock document claims to always succeed
+        self.try_claim_document = AsyncMock(return_value=True)
+        self.get_document = AsyncMock(return_value=None)
+        self.set_document_status = AsyncMock()
 
 class MockIngestionService:
     """Mock ingestion service for testing."""
@@ -21,6 +25,15 @@ class MockIngestionService:
         # Mock processing a file
         self.process_file = AsyncMock(return_value={"status": "processed", "chunks": 1})
 
+class MockRAGService:
+    """Mock RAG service for testing."""
+    def __init__(self, vector_service):
+        self.vector_service = vector_service
+        self.generate = AsyncMock(return_value=("Mock response", []))
+
+    async def generate_stream(self, messages, query):
+        yield ("Mock response", [])
+
 # --- Fixtures ---
 
 @pytest.fixture
@@ -34,22 +47,31 @@ def mock_ingestion_service(mock_vector_service):
     return MockIngestionService(mock_vector_service)
 
 @pytest.fixture
-def client(mock_vector_service, mock_ingestion_service):
+def mock_rag_service(mock_vector_service):
+    """Returns a mock instance of the RAGService."""
+    return MockRAGService(mock_vector_service)
+
+@pytest.fixture
+def client(mock_vector_service, mock_ingestion_service, mock_rag_service, monkeypatch):
     """
     Creates a TestClient with a fresh app instance and 
     INJECTS the mock services into app.state.
     """
+    # Skip warming up the real embedding model and Groq connection
+    monkeypatch.setattr("app.core.events.settings.startup_warmup", False)
+
     # 1. Create a fresh app using the factory
     app = create_app()
 
-    # 2. MANUALLY INJECT MOCKS into app.state
-    # This overrides whatever the lifespan event would have done
-    # and ensures integration tests have access to these services.
-    app.state.vector_service = mock_vector_service
-    app.state.ingestion_service = mock_ingestion_service
-
-    # 3. Return the client
+    # 2. Start the app
     # We use a context manager to ensure startup/shutdown events run
-    # (though our manual injection above ensures the services exist regardless)
     with TestClient(app) as test_client:
-        yield test_client
\ No newline at end of file
+        # 3. MANUALLY INJECT MOCKS into app.state
+        # This happens after startup so it overrides whatever the lifespan
+        # event did and ensures integration tests use these services.
+        app.state.vector_service = mock_vector_service
+        app.state.ingestion_service = mock_ingestion_service
+        app.state.rag_service = mock_rag_service
+
+        # 4. Return the client
+        yield test_client
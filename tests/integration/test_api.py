@@ -1,7 +1,10 @@
 """Integration tests for API endpoints."""
 
 import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
+from arq.jobs import JobStatus
 
 # NOTE: We removed 'from fastapi.testclient import TestClient' 
 # and 'from app.main import app' because the 'client' fixture 
@@ -28,12 +31,100 @@ def test_upload_endpoint_invalid_file(client):
     assert "PDF" in response.json()["detail"]
 
 
+def test_upload_endpoint_not_a_pdf(client):
+    """Test upload endpoint rejects a renamed file without the PDF header."""
+    fake_file = io.BytesIO(b"PK\x03\x04 not really a pdf")
+    response = client.post(
+        "/api/v1/ingestion/upload",
+        files={"file": ("manual.pdf", fake_file, "application/pdf")},
+    )
+    assert response.status_code == 400
+    assert "PDF" in response.json()["detail"]
+
+
+def test_upload_endpoint_file_too_large(client, monkeypatch):
+    """Test upload endpoint rejects files above the size limit."""
+    monkeypatch.setattr("app.api.v1.ingestion.MAX_UPLOAD_SIZE", 10)
+    fake_file = io.BytesIO(b"%PDF-" + b"0" * 100)
+    response = client.post(
+        "/api/v1/ingestion/upload",
+        files={"file": ("big.pdf", fake_file, "application/pdf")},
+    )
+    assert response.status_code == 413
+
+
+def test_upload_endpoint_duplicate_document(client, mock_vector_service):
+    """Test re-uploading an already ingested document is not processed again."""
+    mock_vector_service.try_claim_document.return_value = False
+    mock_vector_service.get_document.return_value = {
+        "content_hash": "abc",
+        "document_name": "manual.pdf",
+        "status": "completed",
+        "job_id": None,
+    }
+    fake_file = io.BytesIO(b"%PDF-1.7 fake content")
+    response = client.post(
+        "/api/v1/ingestion/upload",
+        files={"file": ("manual.pdf", fake_file, "application/pdf")},
+    )
+    assert response.status_code == 200
+    assert "completed" in response.json()["message"]
+
+
+def test_upload_endpoint_releases_claim_when_enqueue_fails(
+    client, mock_vector_service, monkeypatch, tmp_path
+):
+    """Test a failed enqueue marks the claimed document failed and removes the upload."""
+    monkeypatch.setattr("app.api.v1.ingestion.settings.upload_dir", str(tmp_path))
+    arq_pool = MagicMock(close=AsyncMock())
+    arq_pool.enqueue_job = AsyncMock(side_effect=ConnectionError("redis unavailable"))
+    client.app.state.arq_pool = arq_pool
+
+    fake_file = io.BytesIO(b"%PDF-1.7 fake content")
+    with pytest.raises(ConnectionError):
+        client.post(
+            "/api/v1/ingestion/upload",
+            files={"file": ("manual.pdf", fake_file, "application/pdf")},
+        )
+
+    content_hash = mock_vector_service.try_claim_document.call_args.args[0]
+    mock_vector_service.set_document_status.assert_called_once_with(content_hash, "failed")
+    assert list(tmp_path.iterdir()) == []
+
+
 def test_upload_endpoint_missing_file(client):
     """Test upload endpoint without file."""
     response = client.post("/api/v1/ingestion/upload")
     assert response.status_code == 422  # Validation error
 
 
+def test_status_endpoint_without_queue(client):
+    """Test status endpoint reports missing job tracking without a queue."""
+    response = client.get("/api/v1/ingestion/status/some-job")
+    assert response.status_code == 404
+
+
+def test_status_endpoint_reports_failed_job_result(client):
+    """Test a job that returned a failed result is reported failed, not as an error."""
+    client.app.state.arq_pool = MagicMock(close=AsyncMock())
+    with patch("app.api.v1.ingestion.Job") as mock_job:
+        job = mock_job.return_value
+        job.info = AsyncMock(return_value=MagicMock(args=("/tmp/upload", "manual.pdf", "abc")))
+        job.status = AsyncMock(return_value=JobStatus.complete)
+        job.result_info = AsyncMock(
+            return_value=MagicMock(
+                success=True,
+                result={"status": "failed", "error": "Uploaded file is missing"},
+            )
+        )
+        response = client.get("/api/v1/ingestion/status/some-job")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "failed"
+    assert data["error"] == "Uploaded file is missing"
+
+
 def test_chat_endpoint_missing_query(client):
     """Test chat endpoint without required fields."""
     response = client.post(
@@ -66,6 +157,18 @@ async def test_chat_stream_endpoint_structure(client):
     assert response.status_code == 200
 
 
+def test_chat_stream_endpoint_events(client):
+    """Test that streamed chunks are followed by a done event."""
+    response = client.post(
+        "/api/v1/chat/stream",
+        json={"messages": [], "query": "test query"},
+    )
+    assert response.status_code == 200
+    body = response.text
+    assert "Mock response" in body
+    assert body.index("Mock response") < body.index("event: done")
+
+
 def test_api_prefix(client):
     """Verify that API routes are properly prefixed."""
     # Health check should not have prefix
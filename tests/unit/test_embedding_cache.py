@@ -0,0 +1,33 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+from pgvector import Vector
+
+from app.services.embedding_cache import (
+    content_hash,
+    get_cached_embeddings,
+    put_cached_embeddings,
+)
+
+
+@pytest.mark.asyncio
+async def test_cache_lookups_are_scoped_to_the_model():
+    """Test that cache reads and writes are keyed by content hash and model."""
+    pool = MagicMock()
+    conn = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    key = content_hash("Replace the filter monthly.")
+    conn.fetch = AsyncMock(return_value=[{"hash": key, "embedding": Vector([0.6, 0.8])}])
+    conn.executemany = AsyncMock()
+
+    cached = await get_cached_embeddings(pool, "all-mpnet-base-v2", [key, key])
+    await put_cached_embeddings(
+        pool, "all-mpnet-base-v2", {"other": np.array([1.0, 0.0], dtype=np.float32)}
+    )
+
+    assert cached[key].tolist() == pytest.approx([0.6, 0.8])
+    # Repeated hashes are looked up once
+    assert conn.fetch.call_args.args[1:] == ("all-mpnet-base-v2", [key])
+    rows = conn.executemany.call_args.args[1]
+    assert [row[:2] for row in rows] == [("other", "all-mpnet-base-v2")]
@@ -0,0 +1,71 @@
+import sys
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.embeddings import SentenceTransformerEmbeddings
+
+
+@pytest.fixture
+def mock_model():
+    """Patch sentence-transformers so no real model is loaded."""
+    model = MagicMock()
+    model.device.type = "cpu"
+    module = MagicMock()
+    module.SentenceTransformer.return_value = model
+    with patch.dict(sys.modules, {"sentence_transformers": module}):
+        yield module.SentenceTransformer, model
+
+
+@pytest.mark.asyncio
+async def test_embeddings_return_normalized_float32(mock_model):
+    """Test that documents and queries are encoded normalized as float32 arrays."""
+    model_cls, model = mock_model
+    model.encode.side_effect = lambda texts, **kwargs: np.ones(
+        (len(texts), 3) if isinstance(texts, list) else 3, dtype=np.float64
+    )
+
+    embeddings = SentenceTransformerEmbeddings("all-mpnet-base-v2", batch_size=16)
+
+    documents = await embeddings.aembed_documents(["a", "b"])
+    query = await embeddings.aembed_query("q")
+
+    model_cls.assert_called_once_with(
+        "all-mpnet-base-v2", device=None, backend="torch", model_kwargs=None
+    )
+    assert documents.shape == (2, 3) and documents.dtype == np.float32
+    assert query.shape == (3,) and query.dtype == np.float32
+    document_call = model.encode.call_args_list[0]
+    assert document_call.kwargs["batch_size"] == 16
+    assert document_call.kwargs["normalize_embeddings"] is True
+    # CPU inference keeps fp32 weights
+    model.half.assert_not_called()
+
+
+def test_model_runs_in_half_precision_on_cuda(mock_model):
+    """Test that the torch backend switches to fp16 weights on a GPU."""
+    _, model = mock_model
+    model.device.type = "cuda"
+
+    SentenceTransformerEmbeddings("all-mpnet-base-v2")
+
+    model.half.assert_called_once()
+
+
+def test_cache_key_identifies_model_variant(mock_model):
+    """Test that the embedding cache key covers backend, ONNX file and precision."""
+    _, model = mock_model
+
+    torch_cpu = SentenceTransformerEmbeddings("all-mpnet-base-v2")
+    onnx = SentenceTransformerEmbeddings(
+        "all-mpnet-base-v2",
+        backend="onnx",
+        model_kwargs={"file_name": "onnx/model_qint8.onnx"},
+    )
+    model.device.type = "cuda"
+    torch_cuda = SentenceTransformerEmbeddings("all-mpnet-base-v2")
+
+    assert torch_cpu.cache_key == "all-mpnet-base-v2:torch::fp32"
+    assert onnx.cache_key == "all-mpnet-base-v2:onnx:onnx/model_qint8.onnx:fp32"
+    assert torch_cuda.cache_key == "all-mpnet-base-v2:torch::fp16"
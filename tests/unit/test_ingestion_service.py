@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from app.services.ingestion_service import IngestionService
@@ -8,7 +10,8 @@ async def test_process_document_success():
     # 1. Setup Mocks
     mock_vector_svc = MagicMock()
     mock_vector_svc.store_parent_chunk = AsyncMock()
-    mock_vector_svc.store_child_chunks = AsyncMock()
+    mock_vector_svc.bulk_store_child_chunks = AsyncMock()
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=lambda texts: [[0.1]] * len(texts))
     
     service = IngestionService(vector_service=mock_vector_svc)
     
@@ -24,7 +27,9 @@ async def test_process_document_success():
         assert result["parent_chunks"] > 0
         # Verify vector service was called
         mock_vector_svc.store_parent_chunk.assert_called()
-        mock_vector_svc.store_child_chunks.assert_called()
+        mock_vector_svc.bulk_store_child_chunks.assert_called_once()
+        # A small document's child chunks fit in a single embedding batch
+        mock_vector_svc.embed_batch.assert_called_once()
 
 @pytest.mark.asyncio
 async def test_process_document_pdf_error():
@@ -32,9 +37,12 @@ async def test_process_document_pdf_error():
     mock_vector_svc = MagicMock()
     service = IngestionService(vector_service=mock_vector_svc)
     
-    # Simulate a corrupted PDF that causes pdfplumber to fail
-    # We patch pdfplumber.open to raise an exception
-    with patch("pdfplumber.open", side_effect=Exception("Corrupted file header")):
+    # Simulate a corrupted PDF that causes pypdfium2 to fail
+    # We patch PdfDocument to raise an exception
+    with patch(
+        "app.services.ingestion_service.pdfium.PdfDocument",
+        side_effect=Exception("Corrupted file header"),
+    ):
         
         # The service wraps exceptions in ValueError, so we expect that
         with pytest.raises(ValueError, match="Failed to extract text"):
@@ -44,6 +52,7 @@ async def test_process_document_pdf_error():
 async def test_process_document_db_error():
     """Test handling of Vector DB failures."""
     mock_vector_svc = MagicMock()
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=lambda texts: [[0.1]] * len(texts))
     # Simulate DB connection failure
     mock_vector_svc.store_parent_chunk = AsyncMock(side_effect=RuntimeError("Database connection lost"))
     
@@ -54,4 +63,113 @@ async def test_process_document_db_error():
         
         # The exception should propagate up
         with pytest.raises(RuntimeError, match="Database connection lost"):
-            await service.process_document(b"bytes", "test.pdf")
\ No newline at end of file
+            await service.process_document(b"bytes", "test.pdf")
+
+@pytest.mark.asyncio
+async def test_process_document_marks_claimed_document_status():
+    """Test that a claimed document is marked completed or failed."""
+    mock_vector_svc = MagicMock()
+    mock_vector_svc.store_parent_chunk = AsyncMock()
+    mock_vector_svc.bulk_store_child_chunks = AsyncMock()
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=lambda texts: [[0.1]] * len(texts))
+    mock_vector_svc.set_document_status = AsyncMock()
+    mock_vector_svc.delete_document_chunks = AsyncMock()
+
+    service = IngestionService(vector_service=mock_vector_svc)
+
+    with patch.object(service, '_extract_text_from_pdf', return_value="Valid text"):
+        await service.process_document(b"bytes", "test.pdf", content_hash="abc")
+        mock_vector_svc.set_document_status.assert_called_once_with("abc", "completed")
+        # Leftovers of earlier attempts are removed and new chunks tagged with the hash
+        mock_vector_svc.delete_document_chunks.assert_called_once_with("abc")
+        assert mock_vector_svc.store_parent_chunk.call_args.kwargs["content_hash"] == "abc"
+
+    mock_vector_svc.set_document_status.reset_mock()
+    with patch.object(service, '_extract_text_from_pdf', side_effect=ValueError("bad pdf")):
+        with pytest.raises(ValueError):
+            await service.process_document(b"bytes", "test.pdf", content_hash="abc")
+        mock_vector_svc.set_document_status.assert_called_once_with("abc", "failed")
+
+@pytest.mark.asyncio
+async def test_process_document_marks_cancelled_document_failed():
+    """Test that a cancelled ingestion does not leave its document running."""
+    mock_vector_svc = MagicMock()
+    mock_vector_svc.set_document_status = AsyncMock()
+    mock_vector_svc.delete_document_chunks = AsyncMock()
+
+    service = IngestionService(vector_service=mock_vector_svc)
+
+    with patch.object(service, '_ingest_document', side_effect=asyncio.CancelledError):
+        with pytest.raises(asyncio.CancelledError):
+            await service.process_document(b"bytes", "test.pdf", content_hash="abc")
+
+    mock_vector_svc.set_document_status.assert_called_once_with("abc", "failed")
+
+@pytest.mark.asyncio
+async def test_process_document_pipelines_child_batches(monkeypatch):
+    """Test that child chunks are embedded and stored batch by batch."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingest_batch_size", 1)
+    mock_vector_svc = MagicMock()
+    mock_vector_svc.store_parent_chunk = AsyncMock()
+    mock_vector_svc.bulk_store_child_chunks = AsyncMock()
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=lambda texts: [[0.1]] * len(texts))
+
+    service = IngestionService(vector_service=mock_vector_svc)
+
+    text = "\n\n".join(f"Section {i} describes maintenance step {i}. " * 20 for i in range(10))
+    with patch.object(service, '_extract_text_from_pdf', return_value=text):
+        result = await service.process_document(b"fake_bytes", "test.pdf")
+
+    assert result["child_chunks"] > 1
+    assert mock_vector_svc.embed_batch.call_count == result["child_chunks"]
+    assert mock_vector_svc.bulk_store_child_chunks.call_count == result["child_chunks"]
+    stored = [call.args[0][0][1] for call in mock_vector_svc.bulk_store_child_chunks.call_args_list]
+    assert sorted(stored) == sorted(
+        text for call in mock_vector_svc.embed_batch.call_args_list for text in call.args[0]
+    )
+
+@pytest.mark.asyncio
+async def test_process_document_cancels_remaining_batches_on_failure(monkeypatch):
+    """Test that a failed batch stops the other batches from storing child chunks."""
+    monkeypatch.setattr("app.services.ingestion_service.settings.ingest_batch_size", 1)
+    mock_vector_svc = MagicMock()
+    mock_vector_svc.store_parent_chunk = AsyncMock()
+    mock_vector_svc.bulk_store_child_chunks = AsyncMock()
+
+    async def embed(texts):
+        if mock_vector_svc.embed_batch.call_count == 1:
+            raise RuntimeError("model crashed")
+        await asyncio.sleep(0.01)
+        return [[0.1]] * len(texts)
+
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=embed)
+
+    service = IngestionService(vector_service=mock_vector_svc)
+
+    text = "\n\n".join(f"Section {i} describes maintenance step {i}. " * 20 for i in range(10))
+    with patch.object(service, '_extract_text_from_pdf', return_value=text):
+        with pytest.raises(RuntimeError, match="model crashed"):
+            await service.process_document(b"fake_bytes", "test.pdf")
+        await asyncio.sleep(0.05)
+
+    mock_vector_svc.bulk_store_child_chunks.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_process_document_embeds_children_across_parents_in_one_call():
+    """Test that child chunks of several parents share one embedding call."""
+    mock_vector_svc = MagicMock()
+    mock_vector_svc.store_parent_chunk = AsyncMock()
+    mock_vector_svc.bulk_store_child_chunks = AsyncMock()
+    mock_vector_svc.embed_batch = AsyncMock(side_effect=lambda texts: [[0.1]] * len(texts))
+
+    service = IngestionService(vector_service=mock_vector_svc)
+
+    text = "\n\n".join(f"Section {i} covers cleaning step {i}. " * 12 for i in range(6))
+    with patch.object(service, '_extract_text_from_pdf', return_value=text):
+        result = await service.process_document(b"fake_bytes", "test.pdf")
+
+    parents = service.parent_splitter.split_text(text)
+    children = [child for parent in parents for child in service.child_splitter.split_text(parent)]
+    assert result["parent_chunks"] == len(parents) > 1
+    assert len(children) <= 64
+    mock_vector_svc.embed_batch.assert_called_once_with(children)
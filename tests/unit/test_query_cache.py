@@ -0,0 +1,27 @@
+from unittest.mock import patch
+
+import numpy as np
+
+from app.services.query_cache import SemanticQueryCache
+
+
+def test_entries_expire_and_evict_least_recently_used():
+    """Test TTL expiry, top_k matching and LRU slot reuse."""
+    cache = SemanticQueryCache(maxsize=2, ttl=60, threshold=0.95)
+    x = np.array([1.0, 0.0], dtype=np.float32)
+    y = np.array([0.0, 1.0], dtype=np.float32)
+
+    with patch("app.services.query_cache.time.monotonic", return_value=100.0):
+        cache.put("x", x, 5, [{"id": "x"}])
+        cache.put("y", y, 5, [{"id": "y"}])
+        assert cache.lookup(x, 5) == [{"id": "x"}]
+        assert cache.lookup(x, 3) is None
+        # "y" is now least recently used, so it gives up its slot
+        cache.put("z", x, 3, [{"id": "z"}])
+        assert cache.get("y") is None
+        assert cache.lookup(y, 5) is None
+        assert cache.get("x") == [{"id": "x"}]
+
+    with patch("app.services.query_cache.time.monotonic", return_value=161.0):
+        assert cache.get("x") is None
+        assert cache.lookup(x, 3) is None
@@ -51,4 +51,37 @@ async def test_generate_flow():
         assert len(sources) == 1
         assert sources[0]["document_name"] == "manual.pdf"
         
-        mock_vector_svc.retrieve_parent_chunks.assert_called_once_with(query)
\ No newline at end of file
+        mock_vector_svc.retrieve_parent_chunks.assert_called_once_with(query)
+
+
+def test_build_context_reuses_messages_per_chunk():
+    with patch("app.services.rag_service.ChatGroq"):
+        service = RAGService(vector_service=MagicMock())
+
+    chunk = {
+        "id": "123",
+        "content": "Replace the filter monthly.",
+        "document_name": "manual.pdf",
+        "section_title": "Maintenance",
+        "similarity": 0.9,
+    }
+    first_messages, sources = service._build_context([chunk])
+    second_messages, _ = service._build_context([chunk])
+
+    assert "Replace the filter monthly." in first_messages[0].content
+    assert first_messages[0] is second_messages[0]
+    assert sources[0]["section_title"] == "Maintenance"
+
+
+def test_convert_history_excludes_only_current_query():
+    history = [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello!"},
+    ]
+    converted = RAGService._convert_history(history, "How do I reset it?")
+    assert [m.content for m in converted] == ["Hi", "Hello!"]
+
+    converted = RAGService._convert_history(
+        history + [{"role": "user", "content": "How do I reset it?"}], "How do I reset it?"
+    )
+    assert [m.content for m in converted] == ["Hi", "Hello!"]
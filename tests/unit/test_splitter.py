@@ -2,7 +2,7 @@
 
 import pytest
 
-from app.services.ingestion_service import IngestionService
+from app.services.ingestion_service import IngestionService, _get_splitter
 
 
 @pytest.fixture
@@ -85,3 +85,55 @@ def test_parent_child_chunk_relationship(ingestion_service):
         for child in child_chunks:
             assert len(child) <= ingestion_service.child_splitter._chunk_size
             assert len(child) < len(parent_chunks[0])
+
+
+def test_splitter_reused_for_same_parameters(ingestion_service):
+    """Verify that splitters are built once per chunk size and overlap."""
+    _get_splitter.cache_clear()
+    text = "Sentence one. Sentence two. Sentence three. Sentence four. " * 3
+    ingestion_service.split_text_recursive(text, chunk_size=50, chunk_overlap=5)
+    ingestion_service.split_text_recursive(text.upper(), chunk_size=50, chunk_overlap=5)
+    ingestion_service.split_text_recursive(text, chunk_size=80, chunk_overlap=5)
+
+    info = _get_splitter.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_splitters_shared_between_instances(ingestion_service):
+    """Verify that service instances reuse the module-level splitters."""
+    other = IngestionService(None)
+
+    assert other.parent_splitter is ingestion_service.parent_splitter
+    assert other.child_splitter is ingestion_service.child_splitter
+
+
+def test_zero_overlap_is_respected(ingestion_service):
+    """Verify that an explicit zero overlap is not replaced by the default overlap."""
+    text = " ".join(f"word{i}" for i in range(40))
+    chunks = ingestion_service.split_text_recursive(text, chunk_size=30, chunk_overlap=0)
+
+    # Without overlap, the chunks add back up to the original words
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_short_text_matches_splitter_output(ingestion_service):
+    """Verify that the short-text fast path strips text like the splitter does."""
+    assert ingestion_service.split_text_recursive("  \n\n ", chunk_size=100) == []
+    assert ingestion_service.split_text_recursive("\nShort text. ", chunk_size=100) == [
+        "Short text."
+    ]
+
+
+def test_short_text_still_validates_parameters(ingestion_service):
+    """Verify that an overlap larger than the chunk size is rejected even for short text."""
+    with pytest.raises(ValueError):
+        ingestion_service.split_text_recursive("Short text.", chunk_size=50, chunk_overlap=60)
+
+
+def test_none_parameters_use_child_defaults(ingestion_service):
+    """Verify that None chunk size and overlap fall back to the child chunk settings."""
+    text = "Sentence one. Sentence two. Sentence three. Sentence four. " * 40
+
+    assert ingestion_service.split_text_recursive(
+        text, chunk_size=None, chunk_overlap=None
+    ) == ingestion_service.child_splitter.split_text(text)
@@ -1,12 +1,24 @@
+import hashlib
+import uuid
+
+import numpy as np
 import pytest
+from pgvector import Vector
 from unittest.mock import MagicMock, AsyncMock, patch
-from app.services.vector_service import VectorService
+from app.services.vector_service import (
+    CANDIDATE_MULTIPLIER,
+    SCHEMA_VERSION,
+    VectorService,
+    _init_connection,
+    tune_hnsw,
+)
 
 @pytest.fixture
 def mock_db_pool():
     """Create a mock asyncpg pool with a connection context manager."""
     pool = MagicMock()
     connection = MagicMock()
+    connection.execute = AsyncMock()
     
     # Mock the async context manager: async with pool.acquire() as conn:
     pool.acquire.return_value.__aenter__.return_value = connection
@@ -25,21 +37,31 @@ async def test_retrieve_parent_chunks_success(mock_db_pool):
     # 1. Mock Embeddings
     # We must mock this because retrieve_parent_chunks calls aembed_query
     mock_embeddings = MagicMock()
-    mock_embeddings.aembed_query = AsyncMock(return_value=[0.1, 0.2, 0.3])
+    mock_embeddings.aembed_query = AsyncMock(
+        return_value=np.array([0.1, 0.2, 0.3], dtype=np.float32)
+    )
     service.embeddings = mock_embeddings
     
     # 2. Mock DB Results (what conn.fetch returns)
-    # The SQL query returns specific columns, so we mock a Row-like dict
+    # The SQL query returns candidate child embeddings with their parent columns
+    parent = {
+        "id": "123e4567-e89b-12d3-a456-426614174000",
+        "document_name": "manual.pdf",
+        "content": "This is the parent content.",
+        "page_number": 5,
+        "section_title": "Maintenance",
+        "metadata": {"author": "Admin"}, # JSONB codec decodes to a dict
+    }
+    other_parent = {
+        **parent,
+        "id": "223e4567-e89b-12d3-a456-426614174000",
+        "document_name": "other.pdf",
+        "metadata": None,
+    }
     mock_rows = [
-        {
-            "id": "123e4567-e89b-12d3-a456-426614174000",
-            "document_name": "manual.pdf",
-            "content": "This is the parent content.",
-            "page_number": 5,
-            "section_title": "Maintenance",
-            "metadata": '{"author": "Admin"}', # DB returns JSON string
-            "similarity": 0.89
-        }
+        {**other_parent, "embedding": Vector([0.3, 0.2, 0.1])},
+        {**parent, "embedding": Vector([0.2, 0.4, 0.6])},
+        {**other_parent, "embedding": Vector([0.1, 0.2, 0.25])},
     ]
     mock_conn.fetch = AsyncMock(return_value=mock_rows)
 
@@ -47,15 +69,142 @@ async def test_retrieve_parent_chunks_success(mock_db_pool):
     results = await service.retrieve_parent_chunks("how to maintain", top_k=2)
 
     # 4. Assertions
-    assert len(results) == 1
-    assert results[0]["document_name"] == "manual.pdf"
-    assert results[0]["similarity"] == 0.89
-    # Verify JSON string was parsed back to dict
+    # Candidates are reranked by exact cosine, keeping the best child per parent
+    assert [r["document_name"] for r in results] == ["manual.pdf", "other.pdf"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert 0.9 < results[1]["similarity"] < 1.0
+    assert results[1]["metadata"] == {}
+    # Verify decoded metadata is passed through
     assert results[0]["metadata"] == {"author": "Admin"}
+    # Candidate embeddings are not returned
+    assert list(results[0]) == [*parent, "similarity"]
     
     # Verify correct flow
     mock_embeddings.aembed_query.assert_called_once_with("how to maintain")
     mock_conn.fetch.assert_called_once()
+    mock_conn.execute.assert_called_once_with(
+        "SET LOCAL hnsw.ef_search = 40; SET LOCAL jit = off"
+    )
+    # The constant query text lets asyncpg reuse its prepared statement
+    assert mock_conn.fetch.call_args.args[0] is VectorService._RETRIEVE_SQL
+    # The query embedding is bound as a float32 array for the binary vector codec
+    query_embedding = mock_conn.fetch.call_args.args[1]
+    assert isinstance(query_embedding, np.ndarray) and query_embedding.dtype == np.float32
+    # Over-fetch child chunks so enough distinct parents remain
+    assert mock_conn.fetch.call_args.args[2:] == (8,)
+
+    # Repeating the query with another top_k searches again but reuses the embedding
+    await service.retrieve_parent_chunks("how to maintain", top_k=1)
+    assert mock_conn.fetch.call_count == 2
+    assert mock_embeddings.aembed_query.call_count == 1
+
+    # The candidate list grows to cover an over-fetch beyond the tuned ef_search
+    await service.retrieve_parent_chunks("how to maintain", top_k=20)
+    assert mock_conn.fetch.call_args.args[2:] == (80,)
+    assert mock_conn.execute.call_args.args[0] == (
+        "SET LOCAL hnsw.ef_search = 80; SET LOCAL jit = off"
+    )
+
+@pytest.mark.asyncio
+async def test_retrieve_parses_metadata_returned_as_json_text(mock_db_pool):
+    """Test that metadata still becomes a dict on connections without the JSONB codec."""
+    mock_pool, mock_conn = mock_db_pool
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_query = AsyncMock(
+        return_value=np.array([0.1, 0.2, 0.3], dtype=np.float32)
+    )
+    service.embeddings = mock_embeddings
+    mock_conn.fetch = AsyncMock(
+        return_value=[
+            {
+                "id": "123e4567-e89b-12d3-a456-426614174000",
+                "document_name": "manual.pdf",
+                "content": "This is the parent content.",
+                "page_number": 5,
+                "section_title": "Maintenance",
+                "metadata": '{"author": "Admin"}',
+                "embedding": Vector([0.1, 0.2, 0.3]),
+            }
+        ]
+    )
+
+    results = await service.retrieve_parent_chunks("how to maintain")
+
+    assert results[0]["metadata"] == {"author": "Admin"}
+
+@pytest.mark.asyncio
+async def test_retrieve_checks_out_connection_only_to_search(mock_db_pool):
+    """Test that no pool connection is held while embedding or on a semantic cache hit."""
+    mock_pool, mock_conn = mock_db_pool
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_query = AsyncMock(side_effect=RuntimeError("model crashed"))
+    service.embeddings = mock_embeddings
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        await service.retrieve_parent_chunks("how to maintain")
+    mock_pool.acquire.assert_not_called()
+
+    # A near-identical cached query answers without touching the database
+    vector = np.array([0.6, 0.8], dtype=np.float32)
+    mock_embeddings.aembed_query = AsyncMock(return_value=vector)
+    service._query_cache.put("other", vector, 5, [{"id": "1"}])
+
+    assert await service.retrieve_parent_chunks("how to maintain") == [{"id": "1"}]
+    mock_pool.acquire.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_retrieve_parent_chunks_many_groups_results_per_query(mock_db_pool):
+    """Test that batched retrieval embeds once, searches once and splits results by query."""
+    mock_pool, mock_conn = mock_db_pool
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_documents = AsyncMock(
+        return_value=np.array([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]], dtype=np.float32)
+    )
+    service.embeddings = mock_embeddings
+
+    def row(query_index, parent_id, embedding):
+        return {
+            "query_index": query_index,
+            "id": parent_id,
+            "document_name": "manual.pdf",
+            "content": f"Content of {parent_id}",
+            "page_number": 1,
+            "section_title": None,
+            "metadata": None,
+            "embedding": Vector(embedding),
+        }
+
+    mock_conn.fetch = AsyncMock(
+        return_value=[
+            row(1, "b", [0.0, 1.0]),
+            row(0, "b", [0.0, 1.0]),
+            row(0, "a", [1.0, 0.0]),
+            row(1, "a", [1.0, 0.1]),
+        ]
+    )
+
+    results = await service.retrieve_parent_chunks_many(
+        ["filter", "warranty", "anything"], top_k=1
+    )
+
+    assert [[chunk["id"] for chunk in chunks] for chunks in results] == [["a"], ["b"], []]
+    assert "query_index" not in results[0][0]
+    mock_embeddings.aembed_documents.assert_called_once_with(["filter", "warranty", "anything"])
+    mock_conn.fetch.assert_called_once()
+    sql, indexes, vectors, limit = mock_conn.fetch.call_args.args
+    assert "CROSS JOIN LATERAL" in sql
+    assert indexes == [0, 1, 2]
+    assert vectors[1].to_list() == pytest.approx([0.0, 1.0])
+    assert limit == CANDIDATE_MULTIPLIER
 
 @pytest.mark.asyncio
 async def test_retrieve_uninitialized_error():
@@ -73,13 +222,293 @@ async def test_initialization():
     
     # Mock external dependencies
     with patch("asyncpg.create_pool", new_callable=AsyncMock) as mock_create_pool, \
-         patch("app.services.vector_service.HuggingFaceEmbeddings") as mock_hf, \
+         patch("app.services.vector_service.SentenceTransformerEmbeddings") as mock_hf, \
          patch.object(service, '_ensure_schema', new_callable=AsyncMock) as mock_schema:
         
         await service.initialize()
         
         mock_create_pool.assert_called_once()
+        pool_kwargs = mock_create_pool.call_args.kwargs
+        assert pool_kwargs["min_size"] == 4
+        assert pool_kwargs["max_size"] == 10
+        assert pool_kwargs["max_inactive_connection_lifetime"] == 300
+        assert pool_kwargs["statement_cache_size"] == 1024
         mock_hf.assert_called_once()
+        # The model runs one forward pass before serving queries
+        mock_hf.return_value.embed_query.assert_called_once_with("warmup")
         mock_schema.assert_called_once()
         assert service.pool is not None
-        assert service.embeddings is not None
\ No newline at end of file
+        assert service.embeddings is not None
+
+@pytest.mark.asyncio
+async def test_initialization_onnx_backend(monkeypatch):
+    """Test that the ONNX backend and quantized model file reach sentence-transformers."""
+    monkeypatch.setattr("app.services.vector_service.settings.embedding_backend", "onnx")
+    monkeypatch.setattr(
+        "app.services.vector_service.settings.embedding_onnx_file", "onnx/model_qint8.onnx"
+    )
+    service = VectorService()
+
+    with patch("asyncpg.create_pool", new_callable=AsyncMock), \
+         patch("app.services.vector_service.SentenceTransformerEmbeddings") as mock_hf, \
+         patch.object(service, '_ensure_schema', new_callable=AsyncMock):
+
+        await service.initialize()
+
+    assert mock_hf.call_args.kwargs["backend"] == "onnx"
+    assert mock_hf.call_args.kwargs["model_kwargs"] == {"file_name": "onnx/model_qint8.onnx"}
+
+@pytest.mark.asyncio
+async def test_embed_batch_embeds_misses_in_one_call(mock_db_pool):
+    """Test that embed_batch hands all uncached texts to the model at once, in order."""
+    mock_pool, mock_conn = mock_db_pool
+    mock_conn.fetch = AsyncMock(return_value=[])
+    mock_conn.executemany = AsyncMock()
+
+    service = VectorService()
+    service.pool = mock_pool
+
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.array([[float(len(t))] for t in texts], dtype=np.float32)
+    )
+    service.embeddings = mock_embeddings
+
+    texts = ["x" * i for i in range(600)]
+
+    results = await service.embed_batch(texts)
+
+    assert results.dtype == np.float32
+    assert results.tolist() == [[float(len(t))] for t in texts]
+    mock_embeddings.aembed_documents.assert_called_once_with(texts)
+
+@pytest.mark.asyncio
+async def test_embed_batch_only_embeds_uncached_texts(mock_db_pool):
+    """Test that cached and repeated texts are not sent to the embedding model."""
+    mock_pool, mock_conn = mock_db_pool
+    cached_hash = hashlib.sha256(b"cached").hexdigest()
+    mock_conn.fetch = AsyncMock(
+        return_value=[{"hash": cached_hash, "embedding": Vector([9.0, 9.0])}]
+    )
+    mock_conn.executemany = AsyncMock()
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_documents = AsyncMock(
+        return_value=np.array([[1.0, 2.0]], dtype=np.float32)
+    )
+    mock_embeddings.cache_key = "all-mpnet-base-v2:torch::fp32"
+    service.embeddings = mock_embeddings
+
+    results = await service.embed_batch(["new", "cached", "new"])
+
+    assert results.tolist() == [[1.0, 2.0], [9.0, 9.0], [1.0, 2.0]]
+    mock_embeddings.aembed_documents.assert_called_once_with(["new"])
+    cache_rows = mock_conn.executemany.call_args.args[1]
+    assert [row[0] for row in cache_rows] == [hashlib.sha256(b"new").hexdigest()]
+    # Cache entries are looked up and stored per model variant
+    assert mock_conn.fetch.call_args.args[1] == "all-mpnet-base-v2:torch::fp32"
+    assert cache_rows[0][1] == "all-mpnet-base-v2:torch::fp32"
+
+@pytest.mark.asyncio
+async def test_embed_batch_uses_worker_pool(mock_db_pool):
+    """Test that documents are embedded on the multi-process pool when enabled."""
+    mock_pool, mock_conn = mock_db_pool
+    mock_conn.fetch = AsyncMock(return_value=[])
+    mock_conn.executemany = AsyncMock()
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_documents = AsyncMock()
+    mock_embeddings.encode_multi_process.return_value = np.array([[1.0], [2.0]], dtype=np.float32)
+    service.embeddings = mock_embeddings
+    service._encode_pool = {"processes": []}
+
+    results = await service.embed_batch(["a", "b"])
+
+    assert results.tolist() == [[1.0], [2.0]]
+    mock_embeddings.encode_multi_process.assert_called_once()
+    mock_embeddings.aembed_documents.assert_not_called()
+
+def test_fp16_precision_uses_halfvec(monkeypatch):
+    """Test that fp16 precision maps embeddings to pgvector halfvec."""
+    monkeypatch.setattr("app.services.vector_service.settings.embedding_precision", "fp16")
+
+    service = VectorService()
+
+    assert service.vector_type == "halfvec"
+    assert service.vector_ops == "halfvec_ip_ops"
+
+@pytest.mark.asyncio
+async def test_bulk_store_binds_embeddings_without_text_cast(mock_db_pool):
+    """Test that embeddings are bound directly for the binary vector codec."""
+    mock_pool, mock_conn = mock_db_pool
+    mock_conn.executemany = AsyncMock()
+
+    service = VectorService()
+    service.pool = mock_pool
+
+    await service.bulk_store_child_chunks([(uuid.uuid4(), "child", [0.5, 0.25], None)])
+
+    query, records = mock_conn.executemany.call_args.args
+    assert "::" not in query
+    assert records[0][2] == [0.5, 0.25]
+
+@pytest.mark.asyncio
+async def test_store_child_chunks_single_batched_insert(mock_db_pool):
+    """Test that child chunks are inserted with one executemany call."""
+    mock_pool, mock_conn = mock_db_pool
+    mock_conn.fetch = AsyncMock(return_value=[])
+    mock_conn.executemany = AsyncMock()
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_documents = AsyncMock(
+        return_value=np.array([[0.1], [0.2], [0.3]], dtype=np.float32)
+    )
+    service.embeddings = mock_embeddings
+
+    parent_id = uuid.uuid4()
+    await service.store_child_chunks(parent_id, ["a", "b", "c"], {"page": 1})
+
+    child_inserts = [
+        call for call in mock_conn.executemany.call_args_list if "child_chunks" in call.args[0]
+    ]
+    assert len(child_inserts) == 1
+    records = child_inserts[0].args[1]
+    assert [record[1] for record in records] == ["a", "b", "c"]
+    assert all(record[0] == parent_id for record in records)
+    mock_conn.execute.assert_not_called()
+
+def test_tune_hnsw_grows_with_corpus():
+    """Test that HNSW parameters widen as the number of embeddings grows."""
+    small = tune_hnsw(0)
+    medium = tune_hnsw(500_000)
+    large = tune_hnsw(5_000_000)
+
+    assert small == (16, 64, 40)
+    assert small < medium < large
+
+@pytest.mark.asyncio
+async def test_retrieve_reuses_cached_results_for_similar_queries(mock_db_pool):
+    """Test that exact and near-identical queries are served from the query cache."""
+    mock_pool, mock_conn = mock_db_pool
+
+    service = VectorService()
+    service.pool = mock_pool
+    mock_embeddings = MagicMock()
+    mock_embeddings.aembed_query = AsyncMock(
+        side_effect=lambda query: np.array(
+            [1.0, 0.0, 0.0] if "filter" in query else [0.0, 1.0, 0.0], dtype=np.float32
+        )
+    )
+    service.embeddings = mock_embeddings
+    mock_conn.fetch = AsyncMock(
+        return_value=[
+            {
+                "id": "123e4567-e89b-12d3-a456-426614174000",
+                "document_name": "manual.pdf",
+                "content": "Replace the filter monthly.",
+                "page_number": 3,
+                "section_title": "Filters",
+                "metadata": None,
+                "embedding": Vector([1.0, 0.0, 0.0]),
+            }
+        ]
+    )
+
+    first = await service.retrieve_parent_chunks("How do I replace the filter?")
+    exact = await service.retrieve_parent_chunks("  how do I replace the FILTER? ")
+    similar = await service.retrieve_parent_chunks("how to replace the filter")
+    unrelated = await service.retrieve_parent_chunks("What is the warranty?")
+
+    assert first == exact == similar
+    assert unrelated[0]["id"] == first[0]["id"]
+    # The exact repeat skips embedding; the paraphrase skips only the database
+    assert mock_embeddings.aembed_query.call_count == 3
+    assert mock_conn.fetch.call_count == 2
+
+@pytest.mark.asyncio
+async def test_init_connection_registers_codecs():
+    """Test that pool connections decode JSONB to dicts and use binary vectors."""
+    conn = MagicMock()
+    conn.set_type_codec = AsyncMock()
+
+    with patch(
+        "app.services.vector_service.register_vector", new_callable=AsyncMock
+    ) as mock_register:
+        await _init_connection(conn)
+
+    mock_register.assert_called_once_with(conn)
+    codec = conn.set_type_codec.call_args
+    assert codec.args[0] == "jsonb"
+    assert codec.kwargs["format"] == "binary"
+    # Binary JSONB values carry a leading version byte
+    assert codec.kwargs["encoder"]({"page": 1}) == b'\x01{"page":1}'
+    assert codec.kwargs["decoder"](b'\x01{"page": 1}') == {"page": 1}
+
+@pytest.mark.asyncio
+async def test_ensure_schema_skips_ddl_when_version_matches(monkeypatch):
+    """Test that schema DDL only runs when the stored schema version differs."""
+    monkeypatch.setattr("app.services.vector_service.settings.embedding_precision", "fp16")
+    service = VectorService()
+    conn = MagicMock()
+    conn.close = AsyncMock()
+    conn.execute = AsyncMock()
+
+    with patch("asyncpg.connect", new=AsyncMock(return_value=conn)), \
+         patch.object(service, "_apply_schema", new_callable=AsyncMock) as mock_apply:
+        current = f"{SCHEMA_VERSION}:halfvec(768)"
+        conn.fetchval = AsyncMock(side_effect=[0, "schema_meta", current])
+        await service._ensure_schema()
+        mock_apply.assert_not_called()
+        conn.execute.assert_not_called()
+
+        # Another worker migrated while this one waited for the advisory lock
+        conn.fetchval = AsyncMock(
+            side_effect=[0, "schema_meta", "0:vector(768)", "schema_meta", current]
+        )
+        await service._ensure_schema()
+        mock_apply.assert_not_called()
+        assert "pg_advisory_xact_lock" in conn.execute.call_args_list[0].args[0]
+
+        conn.fetchval = AsyncMock(side_effect=[0, None, None])
+        await service._ensure_schema()
+        mock_apply.assert_called_once()
+
+        # A corpus grown into the next HNSW tier only widens ef_search at startup
+        conn.fetchval = AsyncMock(side_effect=[500_000, "schema_meta", current])
+        await service._ensure_schema()
+        mock_apply.assert_called_once()
+        assert service.ef_search == 80
+
+    assert conn.close.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_rebuild_hnsw_index_builds_concurrently():
+    """Test that the index is rebuilt outside a transaction only when its tier changed."""
+    service = VectorService()
+    conn = MagicMock()
+    conn.close = AsyncMock()
+    conn.execute = AsyncMock()
+
+    with patch("asyncpg.connect", new=AsyncMock(return_value=conn)):
+        conn.fetchval = AsyncMock(side_effect=[50_000, ["m=16", "ef_construction=64"]])
+        assert await service.rebuild_hnsw_index() is False
+        conn.execute.assert_not_called()
+
+        conn.fetchval = AsyncMock(side_effect=[500_000, ["m=16", "ef_construction=64"]])
+        assert await service.rebuild_hnsw_index() is True
+
+    statements = [call.args[0] for call in conn.execute.call_args_list]
+    create = next(sql for sql in statements if "CREATE INDEX" in sql)
+    assert "CONCURRENTLY" in create and "m = 24, ef_construction = 128" in create
+    # The old index is only dropped after its replacement was built
+    drop_old = "DROP INDEX CONCURRENTLY IF EXISTS child_chunks_embedding_ip_idx"
+    assert statements.index(create) < statements.index(drop_old)
+    conn.transaction.assert_not_called()
+    assert conn.close.call_count == 2
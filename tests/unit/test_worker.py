@@ -0,0 +1,85 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from arq.jobs import JobStatus
+
+from app.worker import after_job_end, ingest_job
+
+
+@pytest.fixture
+def ctx():
+    """Create an arq job context with mocked services."""
+    return {
+        "vector_service": MagicMock(set_document_status=AsyncMock()),
+        "ingestion_service": MagicMock(
+            process_document=AsyncMock(return_value={"status": "success"})
+        ),
+    }
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_deletes_upload_after_processing(ctx, tmp_path):
+    """Test that the persisted upload is removed once ingestion finishes."""
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.7")
+
+    result = await ingest_job(ctx, str(path), "manual.pdf", "abc")
+
+    assert result == {"status": "success"}
+    assert not path.exists()
+
+
+async def _cancel_job(ctx, path, status):
+    """Cancel an ingest job mid-processing, then end it as arq would with a job status."""
+    ctx.update(job_id="job-1", redis=MagicMock())
+    ctx["ingestion_service"].process_document.side_effect = asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        await ingest_job(ctx, str(path), "manual.pdf", "abc")
+
+    with patch("app.worker.Job") as mock_job:
+        mock_job.return_value.status = AsyncMock(return_value=status)
+        await after_job_end(ctx)
+    mock_job.assert_called_once_with("job-1", ctx["redis"])
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_keeps_upload_when_requeued_after_shutdown(ctx, tmp_path):
+    """Test that a job cancelled by a worker shutdown keeps its upload for the re-run."""
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.7")
+
+    await _cancel_job(ctx, path, JobStatus.queued)
+
+    assert path.exists()
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_deletes_upload_after_timeout(ctx, tmp_path):
+    """Test that a job cancelled by its timeout, which arq never re-runs, drops its upload."""
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.7")
+
+    await _cancel_job(ctx, path, JobStatus.complete)
+
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_after_job_end_ignores_jobs_that_were_not_cancelled(ctx):
+    """Test that jobs which ended normally need no status lookup."""
+    with patch("app.worker.Job") as mock_job:
+        await after_job_end(ctx)
+
+    mock_job.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_marks_missing_upload_failed(ctx, tmp_path):
+    """Test that a job whose upload is gone marks its document failed."""
+    result = await ingest_job(ctx, str(tmp_path / "missing.pdf"), "manual.pdf", "abc")
+
+    assert result["status"] == "failed"
+    ctx["vector_service"].set_document_status.assert_called_once_with("abc", "failed")
+    ctx["ingestion_service"].process_document.assert_not_called()